@@ -0,0 +1,119 @@
+import os
+import time
+import atexit
+import threading
+from datetime import datetime
+
+# In-memory index of today's attendance.
+# attendance.csv is append-only and chronological, so only its tail is read
+# to find today's marks. "Already marked today" is then a set lookup and new
+# marks are buffered and appended in one write() on an O_APPEND descriptor,
+# which keeps lines whole when several classroom processes share the file.
+# Rows are name,timestamp or name,timestamp,room.
+
+ATTENDANCE_FILE = "attendance.csv"
+FLUSH_INTERVAL = 2.0     # seconds between forced flushes of buffered marks
+TAIL_BLOCK = 64 * 1024
+
+
+def read_today_marks(path, date_str, room=None):
+    # Walk backwards from the end of the file until a line from an earlier day
+    marked = set()
+    if not os.path.exists(path):
+        return marked
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b""
+        while pos > 0:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + remainder
+            lines = chunk.split(b"\n")
+            # The first piece may be a partial line unless we reached the start
+            remainder = lines.pop(0) if pos > 0 else b""
+            for raw in reversed(lines):
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                fields = line.split(",")
+                if len(fields) < 2:
+                    continue
+                name, timestamp = fields[0], fields[1]
+                entry_room = fields[2] if len(fields) > 2 else None
+                entry_date = timestamp.split(" ")[0]
+                if entry_date < date_str:
+                    return marked
+                if entry_date == date_str and entry_room == room:
+                    marked.add(name)
+    return marked
+
+
+class AttendanceStore:
+    def __init__(self, path=ATTENDANCE_FILE, flush_interval=FLUSH_INTERVAL, room=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.room = room
+        self.lock = threading.Lock()
+        self.fd = None
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self._load(datetime.now().strftime("%Y-%m-%d"))
+        atexit.register(self.close)
+
+    def _load(self, date_str):
+        self.date = date_str
+        self.marked = read_today_marks(self.path, date_str, self.room)
+
+    def _check_rollover(self, date_str):
+        # Long-running sessions: start a fresh set when the date changes
+        if date_str != self.date:
+            self._flush()
+            self._load(date_str)
+
+    def is_marked(self, name, now=None):
+        with self.lock:
+            self._check_rollover((now or datetime.now()).strftime("%Y-%m-%d"))
+            return name in self.marked
+
+    def mark(self, name, now=None):
+        # Returns True if a new mark was written, False if already marked today.
+        # now defaults to the wall clock; offline video passes the video time.
+        now = now or datetime.now()
+        with self.lock:
+            self._check_rollover(now.strftime("%Y-%m-%d"))
+            if name in self.marked:
+                return False
+            row = f"{name},{now.strftime('%Y-%m-%d %H:%M:%S')}"
+            if self.room is not None:
+                row += f",{self.room}"
+            self.buffer.append(row + "\n")
+            self.marked.add(name)
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+            return True
+
+    def _flush(self):
+        if self.buffer:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            os.write(self.fd, "".join(self.buffer).encode("utf-8"))
+            self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def maybe_flush(self):
+        # Cheap enough to call once per frame from the capture loop
+        if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
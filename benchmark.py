@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+from datetime import datetime
+import numpy as np
+import cv2
+
+# Headless per-stage benchmark.
+# Times every stage of the live loops on the bundled sample images and on
+# synthetic classroom frames built from them (1, 4 and 9 faces per frame):
+# image decode, face detection, encoding, gallery matching (10 to 10,000
+# known faces), FER, pose and event store writes. Each stage reports
+# throughput and p50/p95/p99 latency; the results are written as JSON so
+# two runs can be compared.
+#
+#   python benchmark.py [--repeat 3] [--video Video/lecture.mp4] [--output results.json]
+#   python benchmark.py --compare benchmark_results/<earlier run>.json
+#
+# Stages whose dependencies are missing are reported as skipped. The
+# synthetic frames and gallery use a fixed seed, so runs on the same
+# machine are comparable.
+
+SAMPLE_FOLDERS = ("known_faces", "emotion_images")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tiff", ".tif", ".bmp")
+RESULTS_DIR = "benchmark_results"
+FRAME_SIZE = (1280, 720)
+FACES_PER_FRAME = (1, 4, 9)
+GALLERY_SIZES = (10, 100, 1000, 10000)
+FRAMES = 10               # synthetic frames per faces-per-frame setting
+VIDEO_FRAMES = 30
+REPEAT = 3
+LOG_EVENTS = 2000
+SEED = 0
+REGRESSION_THRESHOLD = 0.10   # --compare flags p50 slowdowns above 10%...
+MIN_DELTA_MS = 0.1            # ...that are also above timer noise
+
+
+def summarize(seconds, items=None):
+    # Latency percentiles in ms; throughput in items (faces, events...) per second
+    samples = np.asarray(seconds, dtype=np.float64) * 1000
+    total = float(np.sum(seconds))
+    items = len(samples) if items is None else items
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "throughput_per_s": round(items / total, 1) if total else None,
+    }
+
+
+def time_calls(fn, inputs, repeat=REPEAT, warmup=1):
+    for args in inputs[:warmup]:
+        fn(*args)
+    timings = []
+    for _ in range(repeat):
+        for args in inputs:
+            start = time.perf_counter()
+            fn(*args)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+# --- Inputs ---
+def sample_paths(folders=SAMPLE_FOLDERS):
+    paths = []
+    for folder in folders:
+        if os.path.isdir(folder):
+            paths += [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(IMAGE_EXTENSIONS)]
+    return paths
+
+
+def decode(path):
+    img = cv2.imread(path)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if img is not None else None
+
+
+def synthetic_frame(faces, count, size=FRAME_SIZE):
+    # Paste count sample faces on a grid; returns the RGB frame and the face boxes
+    cols = int(np.ceil(np.sqrt(count)))
+    rows = int(np.ceil(count / cols))
+    width, height = size
+    cell_w, cell_h = width // cols, height // rows
+    frame = np.full((height, width, 3), 96, dtype=np.uint8)
+    boxes = []
+    for i in range(count):
+        face = faces[i % len(faces)]
+        scale = min(cell_w / face.shape[1], cell_h / face.shape[0]) * 0.9
+        face = cv2.resize(face, (int(face.shape[1] * scale), int(face.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        top = (i // cols) * cell_h + (cell_h - face.shape[0]) // 2
+        left = (i % cols) * cell_w + (cell_w - face.shape[1]) // 2
+        frame[top:top + face.shape[0], left:left + face.shape[1]] = face
+        # The samples are face crops; the central part is the face itself
+        boxes.append((top + face.shape[0] // 8, left + face.shape[1] * 7 // 8,
+                      top + face.shape[0] * 7 // 8, left + face.shape[1] // 8))
+    return frame, boxes
+
+
+def video_frames(path, count=VIDEO_FRAMES):
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+    step = max(1, total // count)
+    frames = []
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if not ret or len(frames) >= count:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+
+def synthetic_gallery(size, real_encodings=(), real_names=(), seed=SEED):
+    # The real gallery padded with random encodings of the same spread
+    rng = np.random.default_rng(seed)
+    real = np.asarray(real_encodings, dtype=np.float32).reshape(-1, 128)[:size]
+    extra = rng.normal(0.0, 0.09, (size - len(real), 128)).astype(np.float32)
+    names = list(real_names)[:len(real)] + [f"SYNTH{i}" for i in range(len(extra))]
+    return np.vstack([real, extra]), names
+
+
+# --- Stages ---
+class Benchmark:
+    def __init__(self, repeat=REPEAT, video=None):
+        self.repeat = repeat
+        self.video = video
+        self.results = {}
+        self.skipped = {}
+        self.frames = {}          # faces per frame -> [(rgb, boxes)]
+        self.encodings = {}       # faces per frame -> [encodings of each frame]
+
+    def record(self, name, timings, items=None):
+        self.results[name] = summarize(timings, items)
+        stats = self.results[name]
+        print(f"{name:<32}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{stats['throughput_per_s'] or 0:>12.1f}")
+
+    def skip(self, stage, reason):
+        self.skipped[stage] = str(reason)
+        print(f"[!] Skipping {stage}: {reason}")
+
+    def run_decode(self):
+        paths = sample_paths()
+        if not paths:
+            return self.skip("decode", f"no sample images in {SAMPLE_FOLDERS}")
+        self.record("decode", time_calls(decode, [(p,) for p in paths], self.repeat))
+        faces = [rgb for rgb in (decode(p) for p in paths) if rgb is not None]
+        if not faces:
+            # The frame-based stages below then have nothing to time
+            return self.skip("synthetic frames", "none of the sample images could be decoded")
+        for count in FACES_PER_FRAME:
+            self.frames[count] = [synthetic_frame(faces[i:] + faces[:i], count) for i in range(FRAMES)]
+
+    def run_detect(self):
+        try:
+            from face_detector import load_detector
+            detector = load_detector()
+        except Exception as e:
+            return self.skip("detect", e)
+        for count, frames in self.frames.items():
+            self.record(f"detect[faces={count}]", time_calls(detector.detect, [(rgb,) for rgb, _ in frames], self.repeat))
+        if self.video:
+            frames = video_frames(self.video)
+            if frames:
+                self.record("detect[video]", time_calls(detector.detect, [(rgb,) for rgb in frames], self.repeat))
+
+    def run_encode(self):
+        try:
+            import face_recognition
+        except ImportError as e:
+            return self.skip("encode", e)
+        for count, frames in self.frames.items():
+            timings = time_calls(face_recognition.face_encodings, frames, self.repeat)
+            self.record(f"encode[faces={count}]", timings, items=count * len(timings))
+            self.encodings[count] = [face_recognition.face_encodings(rgb, boxes) for rgb, boxes in frames]
+
+    def run_match(self):
+        from face_matcher import FaceMatcher
+        try:
+            from face_gallery import load_known_faces
+            known_encodings, known_names = load_known_faces()
+        except Exception as e:
+            print(f"[!] Using a purely synthetic gallery: {e}")
+            known_encodings, known_names = [], []
+        rng = np.random.default_rng(SEED + 1)
+        for size in GALLERY_SIZES:
+            matcher = FaceMatcher(*synthetic_gallery(size, known_encodings, known_names))
+            for count in FACES_PER_FRAME:
+                queries = self.encodings.get(count) or [rng.normal(0.0, 0.09, (count, 128)).astype(np.float32)
+                                                        for _ in range(FRAMES)]
+                timings = time_calls(matcher.match, [(q,) for q in queries], self.repeat)
+                self.record(f"match[gallery={size},faces={count}]", timings, items=count * len(timings))
+
+    def run_fer(self):
+        try:
+            from emotion_classifier import EmotionClassifier, load_emotion_model
+            classifier = EmotionClassifier(load_emotion_model())
+        except Exception as e:
+            return self.skip("fer", e)
+        for count, frames in self.frames.items():
+            timings = time_calls(classifier.scores, frames, self.repeat)
+            self.record(f"fer[faces={count}]", timings, items=count * len(timings))
+
+    def run_pose(self):
+        try:
+            from hand_raise import HandRaiseDetector
+            detector = HandRaiseDetector()
+        except Exception as e:
+            return self.skip("pose", e)
+        try:
+            for count, frames in self.frames.items():
+                timings = time_calls(detector.detect, frames, self.repeat)
+                self.record(f"pose[faces={count}]", timings, items=count * len(timings))
+        finally:
+            detector.close()
+
+    def run_log(self):
+        from event_store import EventStore, EMOTION
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EventStore(os.path.join(tmp, "bench_events.db"))
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            inputs = [(EMOTION, f"STUDENT{i % 50}", timestamp, "Happy") for i in range(LOG_EVENTS)]
+            self.record("log_write[add]", time_calls(store.add, inputs, repeat=1, warmup=0))
+            start = time.perf_counter()
+            store.close()
+            # Time for the writer thread to commit everything still queued
+            self.record("log_write[drain]", [time.perf_counter() - start], items=LOG_EVENTS)
+
+    def run(self, stages):
+        print(f"{'stage':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}")
+        for stage in stages:
+            getattr(self, f"run_{stage}")()
+
+    def report(self):
+        return {
+            "meta": {
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "opencv": cv2.__version__,
+                "numpy": np.__version__,
+                "detector": os.environ.get("FACE_DETECTOR", "default"),
+                "fer_backend": os.environ.get("FER_BACKEND", "auto"),
+                "repeat": self.repeat,
+                "frame_size": FRAME_SIZE,
+                "video": self.video,
+            },
+            "results": self.results,
+            "skipped": self.skipped,
+        }
+
+
+STAGES = ("decode", "detect", "encode", "match", "fer", "pose", "log")
+
+
+def compare(baseline_path, results):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nCompared with {baseline_path} (p50):")
+    print(f"{'stage':<32}{'before':>10}{'after':>10}{'change':>10}")
+    regressions = 0
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["p50_ms"], stats["p50_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > REGRESSION_THRESHOLD and after - before > MIN_DELTA_MS:
+            flag = "  [!] slower"
+            regressions += 1
+        print(f"{name:<32}{before:>10.2f}{after:>10.2f}{change:>+10.0%}{flag}")
+    return regressions
+
+
+def main(args):
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else REPEAT
+    video = args[args.index("--video") + 1] if "--video" in args else None
+    stages = args[args.index("--stages") + 1].split(",") if "--stages" in args else STAGES
+    output = args[args.index("--output") + 1] if "--output" in args else os.path.join(
+        RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    bench = Benchmark(repeat, video)
+    # The synthetic frames come from the decode stage
+    bench.run(["decode"] + [s for s in stages if s != "decode"])
+    report = bench.report()
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[✓] Results saved to {output}")
+
+    if "--compare" in args:
+        regressions = compare(args[args.index("--compare") + 1], report["results"])
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+import numpy as np
+
+# CPU inference backends for the FER model.
+# Every backend takes a float32 (N, 48, 48, 1) batch and returns (N, 7)
+# scores in EMOTION_LABELS order. "auto" loads every backend that is
+# installed and has its model file, times them on a small batch, and keeps
+# the fastest. Set FER_BACKEND (or pass backend=...) to force one.
+#
+#   keras       fer.json + fer.h5
+#   savedmodel  fer_model_saved/   (rebuild_fer_model.py)
+#   onnx        fer.onnx           (convert_to_onnx.py)
+#   openvino    fer.onnx, or fer_model_saved/ if there is no ONNX file
+#
+# Quantized variants (quantize_fer.py) are never picked by "auto"; check
+# them with python quantize_fer.py --evaluate, then set FER_BACKEND:
+#
+#   onnx_int8   fer_int8.onnx      (static int8, ONNX Runtime)
+#   tflite      fer_int8.tflite    (static int8, TFLite)
+#   tflite_fp16 fer_fp16.tflite
+
+FACE_SIZE = 48
+BACKEND_ORDER = ["onnx", "openvino", "savedmodel", "keras"]
+QUANTIZED_BACKENDS = ["onnx_int8", "tflite", "tflite_fp16"]
+BENCHMARK_BATCH = 8
+BENCHMARK_RUNS = 20
+
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, json_path="fer.json", weights_path="fer.h5"):
+        from keras.models import model_from_json
+        with open(json_path, "r") as json_file:
+            self.model = model_from_json(json_file.read())
+        self.model.load_weights(weights_path)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class SavedModelBackend:
+    name = "savedmodel"
+
+    def __init__(self, path="fer_model_saved"):
+        import tensorflow as tf
+        if not os.path.isdir(path):
+            raise FileNotFoundError(path)
+        self.tf = tf
+        self.model = tf.saved_model.load(path)
+        self.infer = self.model.signatures["serving_default"]
+        self.input_name = list(self.infer.structured_input_signature[1].keys())[0]
+
+    def predict(self, batch):
+        outputs = self.infer(**{self.input_name: self.tf.constant(batch)})
+        return next(iter(outputs.values())).numpy()
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path="fer.onnx"):
+        import onnxruntime as ort
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OnnxInt8Backend(OnnxBackend):
+    name = "onnx_int8"
+
+    def __init__(self, path="fer_int8.onnx"):
+        super().__init__(path)
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, path="fer_int8.tflite"):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=os.cpu_count())
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = None
+
+    def predict(self, batch):
+        # The model keeps float32 input/output; only reallocate when the batch size changes
+        if len(batch) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(batch)
+        self.interpreter.set_tensor(self.input_index, np.ascontiguousarray(batch, dtype=np.float32))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class TFLiteFloat16Backend(TFLiteBackend):
+    name = "tflite_fp16"
+
+    def __init__(self, path="fer_fp16.tflite"):
+        super().__init__(path)
+
+
+class OpenVinoBackend:
+    name = "openvino"
+
+    def __init__(self, onnx_path="fer.onnx", saved_model_path="fer_model_saved"):
+        import openvino as ov
+        if os.path.exists(onnx_path):
+            model = ov.convert_model(onnx_path)
+        elif os.path.isdir(saved_model_path):
+            model = ov.convert_model(saved_model_path)
+        else:
+            raise FileNotFoundError(f"{onnx_path} or {saved_model_path}")
+        model.reshape([-1, FACE_SIZE, FACE_SIZE, 1])
+        self.compiled = ov.Core().compile_model(model, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+        self.output = self.compiled.output(0)
+
+    def predict(self, batch):
+        return self.compiled(batch)[self.output]
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "savedmodel": SavedModelBackend,
+    "onnx": OnnxBackend,
+    "openvino": OpenVinoBackend,
+    "onnx_int8": OnnxInt8Backend,
+    "tflite": TFLiteBackend,
+    "tflite_fp16": TFLiteFloat16Backend,
+}
+
+
+def load_available(names=None):
+    backends = {}
+    for name in names or BACKEND_ORDER:
+        try:
+            backends[name] = BACKENDS[name]()
+        except Exception as e:
+            # Missing package, missing file, or a model the runtime rejects
+            print(f"[!] FER backend '{name}' unavailable: {e}")
+    return backends
+
+
+def benchmark(backend, batch_size=BENCHMARK_BATCH, runs=BENCHMARK_RUNS):
+    # Median seconds per batch after one warm-up call
+    batch = np.random.rand(batch_size, FACE_SIZE, FACE_SIZE, 1).astype(np.float32)
+    backend.predict(batch)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def load_backend(backend=None):
+    choice = (backend or os.environ.get("FER_BACKEND") or "auto").lower()
+    if choice != "auto":
+        if choice not in BACKENDS:
+            raise ValueError(f"Unknown FER backend '{choice}', expected one of {sorted(BACKENDS)} or 'auto'")
+        selected = BACKENDS[choice]()
+        print(f"[INFO] Emotion model loaded ({choice}).")
+        return selected
+
+    backends = load_available()
+    if not backends:
+        raise RuntimeError("No FER backend could be loaded")
+    timings = {}
+    for name, b in backends.items():
+        try:
+            timings[name] = benchmark(b)
+        except Exception as e:
+            print(f"[!] FER backend '{name}' unavailable: {e}")
+    if not timings:
+        raise RuntimeError("No FER backend could run a test batch")
+    fastest = min(timings, key=timings.get)
+    summary = ", ".join(f"{name} {t * 1000:.1f} ms" for name, t in sorted(timings.items(), key=lambda kv: kv[1]))
+    print(f"[INFO] Emotion model loaded ({fastest}); batch of {BENCHMARK_BATCH}: {summary}")
+    return backends[fastest]
+
+
+# --- Parity check on the sample emotion_images/ ---
+def load_parity_batch(folder="emotion_images"):
+    import cv2
+    import face_recognition
+    from emotion_classifier import preprocess_face
+    files, faces = [], []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.lower().endswith((".jpg", ".jpeg", ".png", ".tiff", ".bmp")):
+            continue
+        img = cv2.imread(os.path.join(folder, filename))
+        if img is None:
+            continue
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        locations = face_recognition.face_locations(rgb) or [(0, rgb.shape[1], rgb.shape[0], 0)]
+        out = np.zeros((FACE_SIZE, FACE_SIZE, 1), dtype=np.float32)
+        if preprocess_face(rgb, locations[0], out):
+            files.append(filename)
+            faces.append(out)
+    return files, np.stack(faces)
+
+
+def check_parity(reference="keras", atol=1e-3):
+    backends = load_available()
+    if reference not in backends:
+        print(f"[ERROR] Reference backend '{reference}' is not available")
+        return False
+    files, batch = load_parity_batch()
+    expected = backends[reference].predict(batch)
+    ok = True
+    for name, backend in backends.items():
+        if name == reference:
+            continue
+        scores = backend.predict(batch)
+        agree = np.argmax(scores, axis=1) == np.argmax(expected, axis=1)
+        max_diff = float(np.max(np.abs(scores - expected)))
+        status = "✓" if agree.all() and max_diff <= atol else "✗"
+        print(f"[{status}] {name}: top-1 agreement {agree.sum()}/{len(files)}, max |diff| {max_diff:.2e}")
+        for filename in np.array(files)[~agree]:
+            print(f"    disagrees on {filename}")
+        ok &= status == "✓"
+    return ok
+
+
+if __name__ == "__main__":
+    if "--parity" in sys.argv:
+        sys.exit(0 if check_parity() else 1)
+    for name, b in load_available().items():
+        print(f"{name}: {benchmark(b) * 1000:.2f} ms per batch of {BENCHMARK_BATCH}")
@@ -0,0 +1,136 @@
+import time
+from datetime import timedelta
+import cv2
+import numpy as np
+from emotion_backends import FACE_SIZE, load_backend
+from metrics import METRICS
+
+# Batched FER inference.
+# Faces are cropped, resized and normalized straight into one preallocated
+# (batch, 48, 48, 1) array and classified with a single model call, instead
+# of one predict per face.
+
+EMOTION_LABELS = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
+BATCH_SIZE = 32
+MAX_LATENCY = 0.5        # seconds a submitted face may wait for a full batch
+
+# Cooldown-aware scheduling: a student's face only goes through FER when
+# their logging window is open. A short burst of predictions is then
+# averaged into the logged emotion and the window closes again.
+EMOTION_COOLDOWN = timedelta(minutes=10)
+NEUTRAL_RETRY = timedelta(seconds=30)   # Neutral is not logged; look again sooner
+BURST_SIZE = 5
+BURST_GAP = timedelta(seconds=0.2)      # min time between samples of one burst
+
+
+def load_emotion_model(backend=None):
+    # Keras, SavedModel, ONNX Runtime or OpenVINO; see emotion_backends
+    return load_backend(backend)
+
+
+def preprocess_face(rgb, box, out):
+    # Writes the normalized 48x48 grayscale crop into out; False if the box is empty
+    top, right, bottom, left = box
+    h, w = rgb.shape[:2]
+    top, left = max(top, 0), max(left, 0)
+    bottom, right = min(bottom, h), min(right, w)
+    if bottom <= top or right <= left:
+        return False
+    face_img = cv2.resize(rgb[top:bottom, left:right], (FACE_SIZE, FACE_SIZE))
+    gray_face = cv2.cvtColor(face_img, cv2.COLOR_RGB2GRAY)
+    np.multiply(gray_face, 1.0 / 255.0, out=out[:, :, 0], casting="unsafe")
+    return True
+
+
+class EmotionClassifier:
+    def __init__(self, model, batch_size=BATCH_SIZE, max_latency=MAX_LATENCY):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.buffer = np.zeros((batch_size, FACE_SIZE, FACE_SIZE, 1), dtype=np.float32)
+        self.pending = []
+        self.first_pending = None
+
+    def _predict(self, count):
+        with METRICS.timed("fer"):
+            return np.asarray(self.model.predict(self.buffer[:count]))
+
+    # --- Per-frame: all faces of one frame in one call ---
+    def scores(self, rgb, boxes):
+        # One probability vector per box, None where the crop was empty
+        results = [None] * len(boxes)
+        for start in range(0, len(boxes), self.batch_size):
+            slots = []
+            for i, box in enumerate(boxes[start:start + self.batch_size]):
+                if preprocess_face(rgb, box, self.buffer[len(slots)]):
+                    slots.append(start + i)
+            if slots:
+                for index, probs in zip(slots, self._predict(len(slots))):
+                    results[index] = probs
+        return results
+
+    # --- Across images: faces queue up until the batch is full ---
+    # Used by the folder scanner's workers, where every image holds about one
+    # face. Shares the buffer with scores(), so use one style per instance.
+    def submit(self, rgb, box, key):
+        # Returns a list of (key, probabilities) whenever a batch was classified
+        if preprocess_face(rgb, box, self.buffer[len(self.pending)]):
+            if not self.pending:
+                self.first_pending = time.monotonic()
+            self.pending.append(key)
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return self.poll()
+
+    def poll(self):
+        # Classify a partial batch once its oldest face has waited max_latency
+        if self.pending and time.monotonic() - self.first_pending >= self.max_latency:
+            return self.flush()
+        return []
+
+    def flush(self):
+        if not self.pending:
+            return []
+        keys, self.pending = self.pending, []
+        return list(zip(keys, self._predict(len(keys))))
+
+
+def aggregate(scores):
+    # Label of the mean probability vector of several predictions
+    return EMOTION_LABELS[int(np.argmax(np.mean(scores, axis=0)))]
+
+
+class EmotionScheduler:
+    def __init__(self, cooldown=EMOTION_COOLDOWN, burst_size=BURST_SIZE, burst_gap=BURST_GAP,
+                 neutral_retry=NEUTRAL_RETRY):
+        self.cooldown = cooldown
+        self.burst_size = burst_size        # None: the caller closes the window
+        self.burst_gap = burst_gap
+        self.neutral_retry = neutral_retry
+        self.next_due = {}
+        self.last_sample = {}
+        self.bursts = {}
+
+    def due(self, name, now):
+        # Check before inference: is this student's window open and a sample wanted now?
+        if name in self.next_due and now < self.next_due[name]:
+            return False
+        last = self.last_sample.get(name)
+        return last is None or now - last >= self.burst_gap
+
+    def add(self, name, probs, now):
+        # Returns the aggregated label once the burst is complete, else None
+        self.bursts.setdefault(name, []).append(probs)
+        self.last_sample[name] = now
+        if self.burst_size and len(self.bursts[name]) >= self.burst_size:
+            return self.close_window(name, now)
+        return None
+
+    def close_window(self, name, now):
+        label = aggregate(self.bursts.pop(name))
+        self.last_sample.pop(name, None)
+        self.next_due[name] = now + (self.neutral_retry if label == "Neutral" else self.cooldown)
+        return label
+
+    def pending(self):
+        return list(self.bursts)
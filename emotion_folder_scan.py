@@ -1,104 +1,276 @@
-import os
-import json
-import cv2
-import numpy as np
-import face_recognition
-from datetime import datetime, timedelta
-import time
-from keras.models import model_from_json
-
-# --- Load Keras emotion model ---
-with open("fer.json", "r") as json_file:
-    loaded_model_json = json_file.read()
-model = model_from_json(loaded_model_json)
-model.load_weights("fer.h5")
-
-emotion_labels = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
-print("[INFO] Emotion model loaded (Keras).")
-
-# --- Load known faces ---
-print("[INFO] Encoding known faces...")
-known_encodings = []
-known_names = []
-
-for filename in os.listdir("known_faces"):
-    if filename.lower().endswith((".jpg", ".jpeg", ".png", ".tiff", ".bmp")):
-        path = os.path.join("known_faces", filename)
-        image = face_recognition.load_image_file(path)
-        encodings = face_recognition.face_encodings(image)
-        if encodings:
-            known_encodings.append(encodings[0])
-            known_names.append(os.path.splitext(filename)[0].upper())
-            print(f"[✓] Encoded: {filename}")
-
-# --- Emotion logging setup ---
-log_file = "emotion_log.json"
-emotion_logs = []
-
-if os.path.exists(log_file) and os.path.getsize(log_file) > 0:
-    with open(log_file, "r") as f:
-        emotion_logs = json.load(f)
-
-last_logged = {}
-
-def should_log(name):
-    now = datetime.now()
-    if name not in last_logged:
-        last_logged[name] = now
-        return True
-    if now - last_logged[name] >= timedelta(minutes=10):
-        last_logged[name] = now
-        return True
-    return False
-
-def log_emotion(name, emotion, img_file):
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = {
-        "name": name,
-        "emotion": emotion,
-        "image": img_file,
-        "timestamp": now
-    }
-    emotion_logs.append(entry)
-    with open(log_file, "w") as f:
-        json.dump(emotion_logs, f, indent=4)
-    print(f"[LOGGED] {name}: {emotion} ({img_file}) at {now}")
-
-# --- Main scanning loop ---
-print("[INFO] Starting 10-minute emotion scanning loop...")
-try:
-    while True:
-        for img_file in os.listdir("emotion_images"):
-            if img_file.lower().endswith((".jpg", ".jpeg", ".png", ".tiff", ".bmp")):
-                path = os.path.join("emotion_images", img_file)
-                img = cv2.imread(path)
-                rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-                face_locations = face_recognition.face_locations(rgb)
-                face_encodings = face_recognition.face_encodings(rgb, face_locations)
-
-                for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                    matches = face_recognition.compare_faces(known_encodings, face_encoding)
-                    name = "UNKNOWN"
-                    if True in matches:
-                        best_match_index = np.argmin(face_recognition.face_distance(known_encodings, face_encoding))
-                        name = known_names[best_match_index]
-
-                    # --- Emotion detection using Keras model ---
-                    face_img = rgb[top:bottom, left:right]
-                    face_img = cv2.resize(face_img, (48, 48))
-                    gray_face = cv2.cvtColor(face_img, cv2.COLOR_RGB2GRAY)
-                    gray_face = gray_face.astype("float32") / 255.0
-                    gray_face = np.expand_dims(gray_face, axis=(0, -1))  # shape: (1, 48, 48, 1)
-
-                    preds = model.predict(gray_face, verbose=0)
-                    emotion = emotion_labels[np.argmax(preds)]
-
-                    if emotion != "Neutral" and should_log(name):
-                        log_emotion(name, emotion, img_file)
-
-        print("[INFO] Waiting 10 minutes before next scan...\n")
-        time.sleep(600)
-
-except KeyboardInterrupt:
-    print("[INFO] Scanning stopped.")
+import os
+import sys
+import cv2
+import numpy as np
+import face_recognition
+from datetime import datetime, timedelta
+import time
+from concurrent.futures import ProcessPoolExecutor
+from face_gallery import load_known_faces, file_hash, IMAGE_EXTENSIONS
+from face_matcher import FaceMatcher
+from event_store import EventStore, EMOTION
+from face_detector import load_detector
+from emotion_classifier import EmotionScheduler, EMOTION_LABELS, BATCH_SIZE, MAX_LATENCY
+
+# Emotion scan of the emotion_images/ folder.
+# Detection, encoding and FER results are cached per image content hash
+# (emotion_scan_cache.npz), so a scan only analyses new or modified files;
+# those are spread over a process pool whose workers load the models once.
+# Each worker task is a chunk of images; their face crops are queued across
+# images and classified in FER batches of up to BATCH_SIZE, with a partial
+# batch flushed after MAX_LATENCY seconds or at the end of the chunk.
+# Cached faces are matched against the current gallery on every scan.
+#
+#   python emotion_folder_scan.py [--watch] [--workers N] [--batch-size N] [--max-latency SECONDS]
+#
+# --watch checks the folder every few seconds and logs new images as they
+# land; without it the folder is rescanned every 10 minutes.
+
+EMOTION_IMAGES_DIR = "emotion_images"
+SCAN_CACHE = "emotion_scan_cache.npz"
+SCAN_INTERVAL = 600       # seconds between full scans
+WATCH_INTERVAL = 2.0      # seconds between folder checks in --watch mode
+SCAN_WORKERS = min(4, os.cpu_count() or 1)
+SCAN_CHUNK = BATCH_SIZE   # images per worker task
+
+
+# --- Worker side: one detector + FER model per process ---
+_models = {}
+
+
+def init_worker(batch_size=BATCH_SIZE, max_latency=MAX_LATENCY):
+    from emotion_classifier import EmotionClassifier, load_emotion_model
+    # Sample images are small, so no downscaling
+    _models["detector"] = load_detector(scale=1.0)
+    _models["classifier"] = EmotionClassifier(load_emotion_model(), batch_size, max_latency)
+
+
+def analyse_chunk(paths):
+    # [(faces, error)] per path: faces is [(box, encoding, probabilities)] for
+    # every face in the image; one bad file must not abort the whole pool.map
+    if not _models:
+        init_worker()
+    classifier = _models["classifier"]
+    faces = [[] for _ in paths]
+    errors = [None] * len(paths)
+    probs = {}
+    for i, path in enumerate(paths):
+        try:
+            img = cv2.imread(path)
+            if img is None:
+                errors[i] = "could not read image"
+                continue
+            rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            boxes = _models["detector"].detect(rgb)
+            encodings = face_recognition.face_encodings(rgb, boxes)
+        except Exception as e:
+            errors[i] = str(e)
+            continue
+        faces[i] = list(zip(boxes, encodings))
+        try:
+            for j, box in enumerate(boxes):
+                probs.update(classifier.submit(rgb, box, (i, j)))
+        except Exception as e:
+            # The FER model itself failed; nothing in this chunk can be trusted
+            classifier.pending = []
+            return [([], f"emotion model failed: {e}")] * len(paths)
+    try:
+        probs.update(classifier.flush())
+    except Exception as e:
+        return [([], f"emotion model failed: {e}")] * len(paths)
+    # Empty crops have no probabilities and are dropped
+    return [([(box, encoding, probs[i, j]) for j, (box, encoding) in enumerate(image_faces) if (i, j) in probs],
+             errors[i]) for i, image_faces in enumerate(faces)]
+
+
+# --- Result cache ---
+# Files: path -> (size, mtime, sha1). Faces: one row per face, keyed by the
+# sha1 of its image; images without faces simply have no rows.
+def read_scan_cache(cache_path=SCAN_CACHE):
+    if not os.path.exists(cache_path):
+        return {}, {}
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            files = {str(path): {"size": int(size), "mtime": int(mtime), "hash": str(digest)}
+                     for path, size, mtime, digest in zip(data["paths"], data["sizes"], data["mtimes"], data["hashes"])}
+            results = {entry["hash"]: [] for entry in files.values()}
+            for digest, box, encoding, probs in zip(data["face_hashes"], data["boxes"], data["encodings"], data["probs"]):
+                results.setdefault(str(digest), []).append((tuple(int(v) for v in box), encoding, probs))
+            return files, results
+    except Exception as e:
+        print(f"[!] Ignoring unreadable scan cache {cache_path}: {e}")
+        return {}, {}
+
+
+def write_scan_cache(files, results, cache_path=SCAN_CACHE):
+    paths = sorted(files)
+    rows = [(digest, face) for digest in sorted({files[p]["hash"] for p in paths}) for face in results.get(digest, [])]
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        paths=np.array(paths, dtype=str),
+        sizes=np.array([files[p]["size"] for p in paths], dtype=np.int64),
+        mtimes=np.array([files[p]["mtime"] for p in paths], dtype=np.int64),
+        hashes=np.array([files[p]["hash"] for p in paths], dtype=str),
+        face_hashes=np.array([digest for digest, _ in rows], dtype=str),
+        boxes=np.array([face[0] for _, face in rows], dtype=np.int64).reshape(-1, 4),
+        encodings=np.array([face[1] for _, face in rows], dtype=np.float64).reshape(-1, 128),
+        probs=np.array([face[2] for _, face in rows], dtype=np.float32).reshape(-1, len(EMOTION_LABELS)),
+    )
+    os.replace(tmp_path, cache_path)
+
+
+class EmotionFolderScanner:
+    def __init__(self, folder=EMOTION_IMAGES_DIR, workers=SCAN_WORKERS, cache_path=SCAN_CACHE,
+                 batch_size=BATCH_SIZE, max_latency=MAX_LATENCY):
+        self.folder = folder
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.cache_path = cache_path
+        self.pool = None
+        self.files, self.results = read_scan_cache(cache_path)
+
+        # --- Load known faces ---
+        print("[INFO] Loading known faces...")
+        self.matcher = FaceMatcher(*load_known_faces())
+
+        # --- Emotion logging setup ---
+        self.event_store = EventStore()
+        self.emotion_log = self.event_store.log(EMOTION)
+
+        # 10-minute cooldown per student, checked before a face is used.
+        # All crops of a student from one scan are averaged into one emotion.
+        self.scheduler = EmotionScheduler(burst_size=None, burst_gap=timedelta(0))
+        self.image_for = {}   # last image each student was sampled from
+
+    def _analyse(self, paths):
+        # Chunks fill a FER batch but still spread a small scan over every worker
+        size = max(1, min(SCAN_CHUNK, -(-len(paths) // max(1, self.workers))))
+        chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+        if self.workers <= 1:
+            if not _models:
+                init_worker(self.batch_size, self.max_latency)
+            results = map(analyse_chunk, chunks)
+        else:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                initargs=(self.batch_size, self.max_latency))
+            results = self.pool.map(analyse_chunk, chunks)
+        return [result for chunk in results for result in chunk]
+
+    def sync(self):
+        # Returns the paths that are new or whose content changed
+        files, pending, changed = {}, [], []
+        dirty = False
+        for filename in sorted(os.listdir(self.folder)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(self.folder, filename)
+            stat = os.stat(path)
+            entry = self.files.get(path)
+            # Unchanged size + mtime: trust the cached result without reading the file
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+                files[path] = entry
+                continue
+            digest = file_hash(path)
+            files[path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+            dirty = True
+            if entry and entry["hash"] == digest:
+                continue    # Touched but identical
+            changed.append(path)
+            if digest not in self.results:
+                pending.append(path)
+
+        if pending:
+            start = time.perf_counter()
+            for path, (faces, error) in zip(pending, self._analyse(pending)):
+                if error is not None:
+                    # Not cached: retried once the file changes
+                    print(f"[ERROR] Skipping {path}: {error}")
+                    continue
+                self.results[files[path]["hash"]] = faces
+            print(f"[✓] Analysed {len(pending)} new image(s) in {time.perf_counter() - start:.1f}s")
+
+        if dirty or set(files) != set(self.files):
+            live = {entry["hash"] for entry in files.values()}
+            self.results = {digest: faces for digest, faces in self.results.items() if digest in live}
+            self.files = files
+            write_scan_cache(self.files, self.results, self.cache_path)
+        return changed
+
+    def feed(self, paths):
+        # Sample the cached faces of these images for every student whose window is open
+        now = datetime.now()
+        for path in paths:
+            faces = self.results.get(self.files[path]["hash"], [])
+            if not faces:
+                continue
+            matches = self.matcher.match(np.array([encoding for _, encoding, _ in faces]))
+            for (_, _, probs), match in zip(faces, matches):
+                name = match.name or "UNKNOWN"
+                # Students still in their cooldown are skipped
+                if self.scheduler.due(name, now):
+                    self.scheduler.add(name, probs, now)
+                    self.image_for[name] = os.path.basename(path)
+        self.log_scan_emotions()
+
+    def log_emotion(self, name, emotion, img_file):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entry = {
+            "name": name,
+            "emotion": emotion,
+            "image": img_file,
+            "timestamp": now
+        }
+        self.emotion_log.append(entry)
+        print(f"[LOGGED] {name}: {emotion} ({img_file}) at {now}")
+
+    def log_scan_emotions(self):
+        # Close every window sampled in this scan
+        now = datetime.now()
+        for name in self.scheduler.pending():
+            emotion = self.scheduler.close_window(name, now)
+            if emotion != "Neutral":
+                self.log_emotion(name, emotion, self.image_for[name])
+
+    def scan(self):
+        self.sync()
+        self.feed(sorted(self.files))
+
+    def run(self, watch=False):
+        last_scan = None
+        while True:
+            if last_scan is None or time.monotonic() - last_scan >= SCAN_INTERVAL:
+                self.scan()
+                last_scan = time.monotonic()
+                if not watch:
+                    print("[INFO] Waiting 10 minutes before next scan...\n")
+            elif watch:
+                changed = self.sync()
+                if changed:
+                    print(f"[INFO] {len(changed)} new or changed image(s)")
+                    self.feed(changed)
+            time.sleep(WATCH_INTERVAL if watch else SCAN_INTERVAL)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.emotion_log.close()
+        self.event_store.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else SCAN_WORKERS
+    batch_size = int(args[args.index("--batch-size") + 1]) if "--batch-size" in args else BATCH_SIZE
+    max_latency = float(args[args.index("--max-latency") + 1]) if "--max-latency" in args else MAX_LATENCY
+    watch = "--watch" in args
+    scanner = EmotionFolderScanner(workers=workers, batch_size=batch_size, max_latency=max_latency)
+    print(f"[INFO] Starting {'watch mode' if watch else '10-minute'} emotion scanning loop ({workers} worker(s))...")
+    try:
+        scanner.run(watch)
+    except KeyboardInterrupt:
+        print("[INFO] Scanning stopped.")
+    finally:
+        scanner.close()
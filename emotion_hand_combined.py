@@ -1,151 +1,135 @@
 
-import os
-import json
 import cv2
-import numpy as np
-import face_recognition
-import mediapipe as mp
 from datetime import datetime
-from keras.models import model_from_json
-
-# Load FER emotion model
-with open("fer.json", "r") as json_file:
-    loaded_model_json = json_file.read()
-emotion_model = model_from_json(loaded_model_json)
-emotion_model.load_weights("fer.h5")
-emotion_labels = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
-print("[INFO] Emotion model loaded.")
-
-# Load known faces
-known_encodings = []
-known_names = []
-print("[INFO] Encoding known faces...")
-for filename in os.listdir("known_faces"):
-    if filename.lower().endswith((".jpg", ".jpeg", ".png")):
-        path = os.path.join("known_faces", filename)
-        image = face_recognition.load_image_file(path)
-        encodings = face_recognition.face_encodings(image)
-        if encodings:
-            known_encodings.append(encodings[0])
-            known_names.append(os.path.splitext(filename)[0].upper())
-print(f"[✓] Loaded known faces: {known_names}")
-
-# Emotion and engagement log setup
-emotion_log_path = "emotion_log.json"
-engagement_log_path = "engagement_log.json"
-
-emotion_logs = []
-if os.path.exists(emotion_log_path) and os.path.getsize(emotion_log_path) > 0:
-    with open(emotion_log_path, "r") as f:
-        emotion_logs = json.load(f)
-
-engagement_logs = []
-if os.path.exists(engagement_log_path) and os.path.getsize(engagement_log_path) > 0:
-    with open(engagement_log_path, "r") as f:
-        engagement_logs = json.load(f)
-
-last_emotion_logged = {}
-last_hand_logged = {}
-
-# Mediapipe pose setup
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose()
-mp_drawing = mp.solutions.drawing_utils
-
-# Start webcam
-cap = cv2.VideoCapture(0)
-frame_count = 0
-RECOGNITION_INTERVAL = 10
-recognized_name = "UNKNOWN"
-
-def should_log_emotion(name):
-    now = datetime.now()
-    if name not in last_emotion_logged or (now - last_emotion_logged[name]).seconds >= 600:
-        last_emotion_logged[name] = now
-        return True
-    return False
-
-def should_log_hand(name):
-    now = datetime.now()
-    current_minute = now.strftime("%Y-%m-%d %H:%M")
-    if last_hand_logged.get(name) != current_minute:
-        last_hand_logged[name] = current_minute
-        return True
-    return False
-
-def is_hand_raised(landmarks):
-    try:
-        return landmarks.landmark[mp_pose.PoseLandmark.RIGHT_WRIST].y < landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER].y
-    except:
+from face_gallery import load_known_faces
+from face_matcher import FaceMatcher
+from event_store import EventStore, EMOTION, HAND_RAISE
+from emotion_classifier import EmotionClassifier, EmotionScheduler, load_emotion_model
+from pipeline import FramePipeline, show_window, default_source
+from face_tracker import FaceTracker
+from face_detector import load_detector
+from motion_gate import MotionGate, draw_rate
+from hand_raise import HandRaiseDetector, draw_hand_raise
+
+HAND_RAISE_INTERVAL = 10
+
+
+class SessionProcessor:
+    def __init__(self, matcher=None, emotion_model=None, emotion_logs=None, engagement_logs=None, clock=datetime.now,
+                 motion_gate=None, detector=None, hand_raise=None):
+        # Load FER emotion model
+        self.emotion_classifier = EmotionClassifier(emotion_model or load_emotion_model())
+
+        if matcher is None:
+            # Load known faces
+            print("[INFO] Loading known faces...")
+            matcher = FaceMatcher(*load_known_faces())
+        self.matcher = matcher
+
+        # Emotion and engagement log setup; a store created here is closed by close()
+        self.event_store = None
+        if emotion_logs is None or engagement_logs is None:
+            self.event_store = EventStore()
+            emotion_logs = emotion_logs or self.event_store.log(EMOTION)
+            engagement_logs = engagement_logs or self.event_store.log(HAND_RAISE)
+        self.emotion_logs = emotion_logs
+        self.engagement_logs = engagement_logs
+
+        self.clock = clock
+        # Per-student emotion cooldown, checked before any FER inference
+        self.emotion_scheduler = EmotionScheduler()
+        self.last_hand_logged = {}
+        self.detector = detector or load_detector()
+        self.tracker = FaceTracker()
+        # A shared detector passed in stays open when this processor closes
+        self.owns_hand_raise = hand_raise is None
+        self.hand_raise = hand_raise or HandRaiseDetector()
+        # Detection, FER and pose only run when the scene changes (or on the idle heartbeat)
+        self.motion_gate = motion_gate or MotionGate()
+        self.frame_count = 0
+        self.raises = []   # HandRaise results from the last pose pass
+        self.faces = []    # (face box, name) from the last analysed frame
+
+    def should_log_hand(self, name):
+        now = self.clock()
+        current_minute = now.strftime("%Y-%m-%d %H:%M")
+        if self.last_hand_logged.get(name) != current_minute:
+            self.last_hand_logged[name] = current_minute
+            return True
         return False
 
-print("[INFO] Starting combined detection...")
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame_count += 1
-
-    # Face recognition every N frames
-    if frame_count % RECOGNITION_INTERVAL == 0:
-        small = cv2.resize(rgb_frame, (0, 0), fx=0.25, fy=0.25)
-        face_locations = face_recognition.face_locations(small)
-        face_encodings = face_recognition.face_encodings(small, face_locations)
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(known_encodings, face_encoding)
-            distances = face_recognition.face_distance(known_encodings, face_encoding)
-            if True in matches:
-                best_match = np.argmin(distances)
-                recognized_name = known_names[best_match]
-                print(f"[MATCH] Face: {recognized_name}")
-
-    # Emotion detection
-    face_locations = face_recognition.face_locations(rgb_frame)
-    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-    for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-        face_img = rgb_frame[top:bottom, left:right]
-        try:
-            face_img = cv2.resize(face_img, (48, 48))
-            gray_face = cv2.cvtColor(face_img, cv2.COLOR_RGB2GRAY)
-            gray_face = gray_face.astype("float32") / 255.0
-            gray_face = np.expand_dims(gray_face, axis=(0, -1))
-            preds = emotion_model.predict(gray_face, verbose=0)
-            emotion = emotion_labels[np.argmax(preds)]
-            if emotion != "Neutral" and recognized_name != "UNKNOWN" and should_log_emotion(recognized_name):
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                emotion_logs.append({"timestamp": timestamp, "name": recognized_name, "emotion": emotion})
-                print(f"[EMOTION] {recognized_name}: {emotion} at {timestamp}")
-        except:
-            pass
-
-    # Hand raise detection
-    pose_result = pose.process(rgb_frame)
-    if pose_result.pose_landmarks and recognized_name != "UNKNOWN":
-        if is_hand_raised(pose_result.pose_landmarks) and should_log_hand(recognized_name):
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            engagement_logs.append({"timestamp": timestamp, "event": "hand_raise", "student": recognized_name})
-            print(f"[HAND RAISE] {recognized_name} at {timestamp}")
-
-    # Draw landmarks
-    if pose_result.pose_landmarks:
-        mp_drawing.draw_landmarks(frame, pose_result.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-
-    # Display name
-    if recognized_name != "UNKNOWN":
-        cv2.putText(frame, f"{recognized_name}", (30, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 2)
-
-    cv2.imshow("Emotion + Hand Raise Detection", frame)
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-# Save logs
-with open(emotion_log_path, "w") as f:
-    json.dump(emotion_logs, f, indent=4)
-with open(engagement_log_path, "w") as f:
-    json.dump(engagement_logs, f, indent=4)
-print("[INFO] Logs saved.")
-cap.release()
-cv2.destroyAllWindows()
+    def draw(self, frame):
+        # Landmarks, face boxes and names
+        for result in self.raises:
+            draw_hand_raise(frame, result)
+        for (top, right, bottom, left), name in self.faces:
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+            if name:
+                cv2.putText(frame, name, (left, max(top - 10, 20)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        draw_rate(frame, self.motion_gate)
+
+    def process(self, frame):
+        frame = cv2.flip(frame, 1)
+        if not self.motion_gate.check(frame):
+            self.draw(frame)
+            return frame
+
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.frame_count += 1
+
+        # Single (downscaled) detection pass; the boxes feed identity, emotion and drawing
+        face_boxes = self.detector.detect(rgb_frame)
+
+        # Identity is carried by the tracker; only new or stale tracks are encoded
+        tracks = self.tracker.update(face_boxes)
+        for track in self.tracker.recognize(tracks, self.matcher, rgb_frame, face_boxes):
+            if track.name:
+                print(f"[MATCH] Face: {track.name} (track {track.id})")
+        names = [track.name for track in tracks]
+
+        # Emotion detection only for students whose logging window is open,
+        # on full-resolution crops of the same boxes, one batched call
+        now = self.clock()
+        due = [(box, name) for box, name in zip(face_boxes, names) if name and self.emotion_scheduler.due(name, now)]
+        for (_, name), probs in zip(due, self.emotion_classifier.scores(rgb_frame, [box for box, _ in due])):
+            if probs is None:
+                continue
+            # The burst of predictions is averaged into one emotion per window
+            emotion = self.emotion_scheduler.add(name, probs, now)
+            if emotion and emotion != "Neutral":
+                timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+                self.emotion_logs.append({"timestamp": timestamp, "name": name, "emotion": emotion})
+                print(f"[EMOTION] {name}: {emotion} at {timestamp}")
+
+        # Hand raise every N frames: one pose ROI per recognized face, credited to that face
+        if self.frame_count % HAND_RAISE_INTERVAL == 0:
+            recognized = [(box, name) for box, name in zip(face_boxes, names) if name]
+            self.raises = self.hand_raise.detect(rgb_frame, [box for box, _ in recognized])
+            for (_, name), result in zip(recognized, self.raises):
+                if result.raised and self.should_log_hand(name):
+                    timestamp = self.clock().strftime("%Y-%m-%d %H:%M:%S")
+                    self.engagement_logs.append({"timestamp": timestamp, "event": "hand_raise", "student": name})
+                    print(f"[HAND RAISE] {name} at {timestamp}")
+
+        self.faces = list(zip(face_boxes, names))
+        self.draw(frame)
+        return frame
+
+    def close(self):
+        if self.owns_hand_raise:
+            self.hand_raise.close()
+        # Flush logs
+        self.emotion_logs.close()
+        self.engagement_logs.close()
+        if self.event_store is not None:
+            self.event_store.close()
+        print("[INFO] Logs saved.")
+
+
+if __name__ == "__main__":
+    processor = SessionProcessor()
+
+    print("[INFO] Starting combined detection...")
+    FramePipeline(processor.process, show_window("Emotion + Hand Raise Detection"), source=default_source()).run()
+    processor.close()
+    cv2.destroyAllWindows()
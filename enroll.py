@@ -0,0 +1,184 @@
+import os
+import sys
+import csv
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import face_recognition
+from PIL import Image, ImageOps
+from face_gallery import KNOWN_FACES_DIR, GALLERY_CACHE, file_hash, read_cache, write_cache
+
+# Bulk student enrollment.
+# Walks a roster folder (one image per student, named after the student, as
+# in known_faces/), normalizes every image (EXIF orientation, RGB,
+# longest side at most 1024 px, saved as known_faces/<name>.jpg), checks
+# that it holds exactly one clear face, and encodes the images in parallel
+# worker processes. The encodings go straight into the gallery cache
+# (face_gallery.npz), so the runtime scripts load them without encoding
+# again. Rejected images are listed in Enrollment/report_<time>.csv.
+#
+#   python enroll.py roster/ [--workers N] [--replace]
+#
+# --replace re-enrolls students who already have an image in known_faces/.
+# Running it on known_faces/ itself converts the folder to normalized JPEGs.
+
+ENROLL_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tiff", ".tif", ".bmp", ".webp")
+REPORTS_DIR = "Enrollment"
+MAX_SIDE = 1024           # px, longest side of the stored image
+MIN_SIDE = 80             # px, smaller images are rejected
+MIN_FACE = 40             # px, smallest accepted face height
+JPEG_QUALITY = 95
+ENROLL_WORKERS = os.cpu_count() or 1
+
+
+def roster_images(roster):
+    # (source path, student name) pairs
+    return [(os.path.join(roster, filename), os.path.splitext(filename)[0])
+            for filename in sorted(os.listdir(roster)) if filename.lower().endswith(ENROLL_EXTENSIONS)]
+
+
+def normalize_image(path):
+    img = Image.open(path)
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    if max(img.size) > MAX_SIDE:
+        img.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+    return img
+
+
+def enroll_image(source, name, target):
+    # Runs in a worker; returns (status, reason, gallery entry or None)
+    try:
+        img = normalize_image(source)
+    except Exception as e:
+        return "rejected", f"unreadable image: {e}", None
+    if min(img.size) < MIN_SIDE:
+        return "rejected", f"image too small ({img.size[0]}x{img.size[1]})", None
+    rgb = np.asarray(img, dtype=np.uint8)
+    try:
+        locations = face_recognition.face_locations(rgb)
+        if not locations:
+            return "rejected", "no face found", None
+        if len(locations) > 1:
+            return "rejected", f"{len(locations)} faces found", None
+        top, right, bottom, left = locations[0]
+        if bottom - top < MIN_FACE:
+            return "rejected", f"face too small ({bottom - top}px)", None
+        encoding = face_recognition.face_encodings(rgb, locations)[0]
+    except Exception as e:
+        return "rejected", f"face detection failed: {e}", None
+
+    tmp_path = target + ".tmp.jpg"
+    img.save(tmp_path, "JPEG", quality=JPEG_QUALITY)
+    os.replace(tmp_path, target)
+    stat = os.stat(target)
+    return "enrolled", "", {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": file_hash(target),
+        "name": name.upper(),
+        "has_face": True,
+        "encoding": encoding,
+    }
+
+
+def enroll_task(args):
+    return enroll_image(*args)
+
+
+def existing_images(folder=KNOWN_FACES_DIR):
+    # Upper-cased student name -> image paths already in the gallery folder
+    existing = {}
+    for filename in os.listdir(folder):
+        if filename.lower().endswith(ENROLL_EXTENSIONS):
+            existing.setdefault(os.path.splitext(filename)[0].upper(), []).append(os.path.join(folder, filename))
+    return existing
+
+
+def plan(images, replace=False, folder=KNOWN_FACES_DIR):
+    # Split the roster into encode tasks and early rejections
+    existing = existing_images(folder)
+    tasks, rows, seen = [], [], set()
+    for source, name in images:
+        key = name.upper()
+        if key in seen:
+            rows.append((source, key, "rejected", "duplicate student name in roster"))
+            continue
+        seen.add(key)
+        others = [p for p in existing.get(key, []) if os.path.abspath(p) != os.path.abspath(source)]
+        in_place = os.path.abspath(os.path.dirname(source)) == os.path.abspath(folder)
+        if others and not replace and not in_place:
+            rows.append((source, key, "rejected", f"already enrolled ({others[0]}); use --replace"))
+            continue
+        tasks.append((source, name, os.path.join(folder, f"{name}.jpg")))
+    return tasks, rows
+
+
+def enroll(roster, workers=ENROLL_WORKERS, replace=False, folder=KNOWN_FACES_DIR, cache_path=GALLERY_CACHE):
+    images = roster_images(roster)
+    if not images:
+        print(f"[ERROR] No images found in {roster}")
+        return []
+    os.makedirs(folder, exist_ok=True)
+    tasks, rows = plan(images, replace, folder)
+    print(f"[INFO] Enrolling {len(tasks)} of {len(images)} image(s) from {roster} with {workers} worker(s)...")
+
+    start = time.perf_counter()
+    if workers <= 1:
+        results = map(enroll_task, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(enroll_task, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+
+    cache = read_cache(cache_path)
+    existing = existing_images(folder)
+    replaced = []
+    try:
+        for done, ((source, name, target), (status, reason, entry)) in enumerate(zip(tasks, results), 1):
+            rows.append((source, name.upper(), status, reason))
+            if entry is not None:
+                # The normalized JPEG replaces any other image of the student
+                for old in existing.get(name.upper(), []):
+                    if os.path.abspath(old) != os.path.abspath(target):
+                        replaced.append(old)
+                        cache.pop(old, None)
+                cache[target] = entry
+            if done % 100 == 0:
+                print(f"[INFO] {done}/{len(tasks)} processed ({time.perf_counter() - start:.0f}s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    write_cache(cache, cache_path)
+    # Old images go only once the cache holds their replacements
+    for old in replaced:
+        if os.path.exists(old):
+            os.remove(old)
+
+    enrolled = sum(1 for row in rows if row[2] == "enrolled")
+    print(f"[✓] Enrolled {enrolled} student(s), rejected {len(rows) - enrolled}, in {time.perf_counter() - start:.1f}s")
+    write_report(rows)
+    return rows
+
+
+def write_report(rows):
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    report_path = os.path.join(REPORTS_DIR, f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    with open(report_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["image", "student", "status", "reason"])
+        writer.writerows(sorted(rows, key=lambda row: (row[2] == "enrolled", row[0])))
+    for source, name, status, reason in rows:
+        if status != "enrolled":
+            print(f"[!] {source}: {reason}")
+    print(f"[✓] Report saved to {report_path}")
+    return report_path
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("Usage: python enroll.py <roster folder> [--workers N] [--replace]")
+        sys.exit(1)
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else ENROLL_WORKERS
+    enroll(args[0], workers, replace="--replace" in args)
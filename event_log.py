@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+# Append-only JSON Lines event logs.
+# Producers append one record per line and fsync in batches; readers stream
+# records back one at a time. The old emotion_log.json / engagement_log.json
+# arrays are converted once, the first time the .jsonl log is opened.
+
+EMOTION_LOG = "emotion_log.jsonl"
+ENGAGEMENT_LOG = "engagement_log.jsonl"
+FSYNC_EVERY = 20         # records
+FSYNC_INTERVAL = 5.0     # seconds
+
+
+def legacy_path_for(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def migrate_json_array(json_path, jsonl_path):
+    # One-time conversion; skipped once the .jsonl file exists
+    if os.path.exists(jsonl_path) or not os.path.exists(json_path) or os.path.getsize(json_path) == 0:
+        return False
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    tmp_path = jsonl_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, jsonl_path)
+    print(f"[✓] Migrated {len(records)} records from {json_path} to {jsonl_path}")
+    return True
+
+
+def read_events(path):
+    migrate_json_array(legacy_path_for(path), path)
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash; everything before it is intact
+                continue
+
+
+class EventLog:
+    # Each record goes out as one write() on an O_APPEND descriptor, so several
+    # processes (one per classroom) can append to the same log without
+    # interleaving partial lines. room, when set, is added to every record.
+    def __init__(self, path, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL, room=None):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.room = room
+        self.lock = threading.Lock()
+        migrate_json_array(legacy_path_for(path), path)
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        atexit.register(self.close)
+
+    def append(self, record):
+        if self.room is not None:
+            record = {**record, "room": self.room}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            if self.fd is None:
+                return
+            os.write(self.fd, line)
+            self.pending += 1
+            if self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self.fd)
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def sync(self):
+        with self.lock:
+            if self.fd is not None and self.pending:
+                self._sync()
+
+    def close(self):
+        with self.lock:
+            if self.fd is not None:
+                if self.pending:
+                    self._sync()
+                os.close(self.fd)
+                self.fd = None
@@ -0,0 +1,360 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+from event_log import read_events
+from metrics import METRICS
+
+# Single SQLite event store for attendance, emotion and engagement events.
+# The database runs in WAL mode, so the live scripts, the orchestrator's
+# room processes and the Streamlit app can write and read it at the same
+# time. Writers hand rows to a background thread that inserts them in
+# batches; readers query by date / student / event type through the
+# (date, student, event) index instead of scanning whole files.
+#
+# The old attendance.csv, emotion/engagement .json/.jsonl logs and any
+# video_batch results are imported once when the database is created;
+# import (or re-import) more with:
+#   python event_store.py --import [files or Video/results/<name> ...]
+
+EVENT_DB = "class_events.db"
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0     # seconds a queued row may wait before it is written
+BUSY_TIMEOUT = 30.0      # seconds to wait for another writer's lock
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+ATTENDANCE = "attendance"
+EMOTION = "emotion"
+HAND_RAISE = "hand_raise"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id        INTEGER PRIMARY KEY,
+    date      TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    student   TEXT NOT NULL,
+    event     TEXT NOT NULL,
+    value     TEXT,
+    room      TEXT,
+    source    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_date_student_event ON events(date, student, event);
+CREATE INDEX IF NOT EXISTS idx_events_date_event ON events(date, event);
+CREATE INDEX IF NOT EXISTS idx_events_source ON events(source);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_once
+    ON events(date, student, IFNULL(room, '')) WHERE event = 'attendance';
+"""
+
+# Per-day rollups (attendance, emotion counts, hand-raise counts per student)
+# are kept current by triggers as events are inserted or replaced, so a
+# day's summary reads a handful of rollup rows instead of the event history.
+ROLLUP_SCHEMA = [
+    """CREATE TABLE daily_rollup (
+        date       TEXT NOT NULL,
+        event      TEXT NOT NULL,
+        student    TEXT NOT NULL,
+        value      TEXT NOT NULL DEFAULT '',
+        count      INTEGER NOT NULL,
+        first_seen TEXT NOT NULL,
+        PRIMARY KEY (date, event, student, value)
+    ) WITHOUT ROWID""",
+    """CREATE TRIGGER rollup_insert AFTER INSERT ON events BEGIN
+        INSERT INTO daily_rollup (date, event, student, value, count, first_seen)
+        VALUES (NEW.date, NEW.event, NEW.student, IFNULL(NEW.value, ''), 1, NEW.timestamp)
+        ON CONFLICT (date, event, student, value)
+        DO UPDATE SET count = count + 1, first_seen = MIN(first_seen, excluded.first_seen);
+    END""",
+    """CREATE TRIGGER rollup_delete AFTER DELETE ON events BEGIN
+        UPDATE daily_rollup SET count = count - 1
+        WHERE date = OLD.date AND event = OLD.event AND student = OLD.student AND value = IFNULL(OLD.value, '');
+        DELETE FROM daily_rollup
+        WHERE date = OLD.date AND event = OLD.event AND student = OLD.student AND value = IFNULL(OLD.value, '')
+          AND count <= 0;
+    END""",
+    # Databases created before the rollups existed: build them once from the events
+    """INSERT INTO daily_rollup (date, event, student, value, count, first_seen)
+       SELECT date, event, student, IFNULL(value, ''), COUNT(*), MIN(timestamp)
+       FROM events GROUP BY date, event, student, IFNULL(value, '')""",
+]
+
+INSERT = ("INSERT OR IGNORE INTO events (date, timestamp, student, event, value, room, source) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def connect(path=EVENT_DB):
+    created = not os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    ensure_rollups(conn)
+    if created and path == EVENT_DB:
+        # One-time import of the file logs written before the store existed
+        import_paths(conn, default_import_paths())
+    return conn
+
+
+def ensure_rollups(conn):
+    # Table, triggers and backfill in one write transaction, so concurrent
+    # writers can't slip events in between the backfill and the triggers
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'daily_rollup'").fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'daily_rollup'").fetchone():
+            for statement in ROLLUP_SCHEMA:
+                conn.execute(statement)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+def make_row(event, student, timestamp, value=None, room=None, source=None):
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.strftime(TIME_FORMAT)
+    return (timestamp[:10], timestamp, student, event, value, room, source)
+
+
+# --- Writing ---
+class EventStore:
+    def __init__(self, path=EVENT_DB, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        connect(path).close()   # create the schema before the first reader shows up
+        self.queue = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self._writer, name="event-store", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def add(self, event, student, timestamp, value=None, room=None, source=None):
+        if not self.closed:
+            self.queue.put(make_row(event, student, timestamp, value, room, source))
+
+    def _writer(self):
+        conn = connect(self.path)
+        done = False
+        while not done:
+            batch = []
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is None:
+                        done = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    with METRICS.timed("log_write"), conn:
+                        conn.executemany(INSERT, batch)
+            except sqlite3.Error as e:
+                print(f"[ERROR] Could not write {len(batch)} event(s): {e}")
+            finally:
+                # flush() waits on these
+                for _ in range(len(batch) + done):
+                    self.queue.task_done()
+        conn.close()
+
+    def flush(self):
+        # Block until every queued row has been written
+        if not self.closed:
+            self.queue.join()
+
+    def close(self):
+        # Only the store's owner closes it; views just flush
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
+
+    # Producer-side views with the AttendanceStore / EventLog interfaces.
+    # Several views can share one store; closing a view only flushes it.
+    def attendance(self, room=None):
+        return StoreAttendance(self, room)
+
+    def log(self, event, room=None):
+        return StoreLog(self, event, room)
+
+
+class StoreAttendance:
+    # Same interface as attendance_store.AttendanceStore
+    def __init__(self, store, room=None):
+        self.store = store
+        self.room = room
+        self.date = None
+        self.marked = set()
+        self.lock = threading.Lock()
+
+    def _check_rollover(self, date_str):
+        if date_str != self.date:
+            self.date = date_str
+            conn = connect(self.store.path)
+            self.marked = {row["student"] for row in conn.execute(
+                "SELECT student FROM events WHERE date = ? AND event = ? AND room IS ?",
+                (date_str, ATTENDANCE, self.room))}
+            conn.close()
+
+    def is_marked(self, name, now=None):
+        with self.lock:
+            self._check_rollover((now or datetime.now()).strftime("%Y-%m-%d"))
+            return name in self.marked
+
+    def mark(self, name, now=None):
+        now = now or datetime.now()
+        with self.lock:
+            self._check_rollover(now.strftime("%Y-%m-%d"))
+            if name in self.marked:
+                return False
+            self.marked.add(name)
+        self.store.add(ATTENDANCE, name, now, room=self.room)
+        return True
+
+    def flush(self):
+        self.store.flush()
+
+    def maybe_flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class StoreLog:
+    # Same interface as event_log.EventLog for emotion / engagement records
+    def __init__(self, store, event, room=None):
+        self.store = store
+        self.event = event
+        self.room = room
+
+    def append(self, record):
+        student, value, source = record_fields(self.event, record)
+        self.store.add(self.event, student, record["timestamp"], value, record.get("room", self.room), source)
+
+    def sync(self):
+        self.store.flush()
+
+    def close(self):
+        self.sync()
+
+
+def record_fields(event, record):
+    # (student, value, source) of an emotion or engagement log record
+    if event == EMOTION:
+        return record["name"], record["emotion"], record.get("image")
+    return record["student"], None, None
+
+
+# --- Reading ---
+# Daily views read the rollups; cost depends on the students of that day only
+def daily_attendance(conn, date):
+    # Students in order of their first mark
+    rows = conn.execute("SELECT student FROM daily_rollup WHERE date = ? AND event = ? "
+                        "GROUP BY student ORDER BY MIN(first_seen)", (date, ATTENDANCE))
+    return [row["student"] for row in rows]
+
+
+def daily_counts(conn, date, event):
+    # {student: {value: count}} for emotions, {student: count} for hand raises
+    rows = conn.execute("SELECT student, value, count FROM daily_rollup WHERE date = ? AND event = ? "
+                        "ORDER BY first_seen", (date, event))
+    counts = {}
+    for row in rows:
+        if event == EMOTION:
+            counts.setdefault(row["student"], {})[row["value"]] = row["count"]
+        else:
+            counts[row["student"]] = counts.get(row["student"], 0) + row["count"]
+    return counts
+
+
+def rollup_rows(conn, start, end):
+    # Every rollup row in [start, end], one date after the other (a single index range scan)
+    return conn.execute("SELECT * FROM daily_rollup WHERE date >= ? AND date <= ? ORDER BY date, first_seen",
+                        (start, end))
+
+
+# --- Importing the old files ---
+def read_attendance_csv(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.strip().split(",")
+            if len(fields) >= 2:
+                yield fields[0], fields[1], fields[2] if len(fields) > 2 else None
+
+
+def import_file(conn, path, room=None):
+    # Re-importing a file replaces the rows it produced last time
+    source = os.path.normpath(path)
+    name = os.path.basename(path)
+    rows = []
+    if name.endswith(".csv"):
+        for student, timestamp, row_room in read_attendance_csv(path):
+            rows.append(make_row(ATTENDANCE, student.upper(), timestamp, room=row_room or room, source=source))
+    else:
+        event = EMOTION if name.startswith("emotion") else HAND_RAISE
+        if path.endswith(".jsonl"):
+            records = read_events(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        for record in records:
+            if event == HAND_RAISE and record.get("event", HAND_RAISE) != HAND_RAISE:
+                continue
+            student, value, image = record_fields(event, record)
+            rows.append(make_row(event, student, record["timestamp"], value,
+                                 record.get("room", room), f"{source}:{image}" if image else source))
+    with conn:
+        # source, or "source:image" for emotion rows (";" sorts right after ":")
+        conn.execute("DELETE FROM events WHERE source = ? OR (source >= ? AND source < ?)",
+                     (source, source + ":", source + ";"))
+        conn.executemany(INSERT, rows)
+    print(f"[✓] Imported {len(rows)} record(s) from {path}")
+    return len(rows)
+
+
+def import_paths(conn, paths):
+    # Files, or directories such as Video/results/<name> holding them
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            room = os.path.basename(os.path.normpath(path))
+            for name in ("attendance.csv", "emotion_log.jsonl", "engagement_log.jsonl"):
+                if os.path.exists(os.path.join(path, name)):
+                    total += import_file(conn, os.path.join(path, name), room)
+        elif os.path.exists(path):
+            total += import_file(conn, path)
+        else:
+            print(f"[!] Not found: {path}")
+    return total
+
+
+def default_import_paths():
+    # The live logs in whichever format exists, plus every video_batch result
+    paths = ["attendance.csv"]
+    for base in ("emotion_log", "engagement_log"):
+        paths.append(base + ".jsonl" if os.path.exists(base + ".jsonl") else base + ".json")
+    results = os.path.join("Video", "results")
+    if os.path.isdir(results):
+        paths += [os.path.join(results, d) for d in sorted(os.listdir(results))]
+    return [p for p in paths if os.path.exists(p)]
+
+
+if __name__ == "__main__":
+    if "--import" in sys.argv:
+        paths = sys.argv[sys.argv.index("--import") + 1:] or default_import_paths()
+        conn = connect()
+        import_paths(conn, paths)
+        total = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        conn.close()
+        print(f"[✓] {total} record(s) in {EVENT_DB}")
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from geometry import iou_matrix
+from metrics import METRICS
+
+# Face detection backends.
+# Every backend takes an RGB image and returns boxes as
+# (top, right, bottom, left) in that image's coordinates, like
+# face_recognition.face_locations. FaceDetector runs the backend on a
+# downscaled copy of the frame and maps the boxes back to full-frame
+# coordinates. With tiles=(rows, cols) it also runs a second, higher
+# resolution pass over overlapping tiles (a two-level pyramid) so small
+# faces at the back of the room are found; both passes are merged with NMS.
+# Set FACE_DETECTOR (or pass backend=...) to pick one, FACE_DETECTOR_TILES
+# (e.g. "2x2") to enable tiling.
+#
+#   hog     face_recognition / dlib HOG (default, previous behaviour)
+#   haar    OpenCV Haar cascade (ships with opencv-python)
+#   yunet   OpenCV FaceDetectorYN, needs face_detection_yunet_2023mar.onnx
+#           from the OpenCV model zoo (models/face_detection_yunet)
+#
+# Speed and recall on the sample images: python face_detector.py --benchmark
+
+DETECTOR_ORDER = ["yunet", "haar", "hog"]
+DEFAULT_DETECTOR = "hog"
+DETECTION_SCALE = 0.25
+TILE_SCALE = 0.5          # resolution of the tiled pass
+TILE_OVERLAP = 0.2
+NMS_IOU = 0.3
+YUNET_MODEL = "face_detection_yunet_2023mar.onnx"
+BENCHMARK_FOLDERS = ["known_faces", "emotion_images"]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tiff", ".bmp")
+
+
+class HogDetector:
+    name = "hog"
+
+    def __init__(self, upsample=1):
+        import face_recognition
+        self.face_recognition = face_recognition
+        self.upsample = upsample
+
+    def detect(self, rgb):
+        return self.face_recognition.face_locations(rgb, number_of_times_to_upsample=self.upsample, model="hog")
+
+
+class HaarDetector:
+    name = "haar"
+
+    def __init__(self, path=None, min_size=20):
+        path = path or os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise FileNotFoundError(path)
+        self.min_size = min_size
+
+    def detect(self, rgb):
+        gray = cv2.equalizeHist(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5,
+                                              minSize=(self.min_size, self.min_size))
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in faces]
+
+
+class YuNetDetector:
+    name = "yunet"
+
+    def __init__(self, path=YUNET_MODEL, score_threshold=0.7):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.model = cv2.FaceDetectorYN.create(path, "", (320, 320), score_threshold)
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        self.model.setInputSize((w, h))
+        _, faces = self.model.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return [(int(y), int(x + fw), int(y + fh), int(x)) for x, y, fw, fh in faces[:, :4]]
+
+
+BACKENDS = {
+    "hog": HogDetector,
+    "haar": HaarDetector,
+    "yunet": YuNetDetector,
+}
+
+
+def parse_tiles(value):
+    # "2x3" -> (2, 3); empty -> None
+    if not value:
+        return None
+    rows, cols = value.lower().split("x")
+    return int(rows), int(cols)
+
+
+def tile_grid(h, w, rows, cols, overlap=TILE_OVERLAP):
+    # Overlapping (top, bottom, left, right) tiles covering the frame
+    tile_h, tile_w = int(h / rows * (1 + overlap)), int(w / cols * (1 + overlap))
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            top = min(int(r * h / rows), max(h - tile_h, 0))
+            left = min(int(c * w / cols), max(w - tile_w, 0))
+            tiles.append((top, min(top + tile_h, h), left, min(left + tile_w, w)))
+    return tiles
+
+
+def non_max_suppression(boxes, iou_threshold=NMS_IOU):
+    # Keeps the larger of overlapping boxes
+    if len(boxes) < 2:
+        return list(boxes)
+    arr = np.asarray(boxes, dtype=np.float32)
+    areas = (arr[:, 2] - arr[:, 0]) * (arr[:, 1] - arr[:, 3])
+    order = np.argsort(-areas)
+    iou = iou_matrix(arr, arr)
+    keep = []
+    for i in order:
+        if all(iou[i, j] <= iou_threshold for j in keep):
+            keep.append(i)
+    return [boxes[i] for i in sorted(keep)]
+
+
+class FaceDetector:
+    def __init__(self, backend, scale=DETECTION_SCALE, tiles=None, tile_scale=TILE_SCALE):
+        self.backend = backend
+        self.name = backend.name
+        self.scale = scale
+        self.tiles = tiles
+        self.tile_scale = tile_scale
+
+    def _detect_scaled(self, rgb, scale, offset=(0, 0)):
+        image = rgb if scale == 1 else cv2.resize(rgb, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        dy, dx = offset
+        return [(int(t / scale) + dy, int(r / scale) + dx, int(b / scale) + dy, int(l / scale) + dx)
+                for t, r, b, l in self.backend.detect(np.ascontiguousarray(image))]
+
+    def detect(self, rgb):
+        # Boxes in rgb's (full-frame) coordinates
+        with METRICS.timed("detect"):
+            boxes = self._detect_scaled(rgb, self.scale)
+            if self.tiles:
+                h, w = rgb.shape[:2]
+                for top, bottom, left, right in tile_grid(h, w, *self.tiles):
+                    boxes += self._detect_scaled(rgb[top:bottom, left:right], self.tile_scale, (top, left))
+                boxes = non_max_suppression(boxes)
+        METRICS.observe_faces(len(boxes))
+        h, w = rgb.shape[:2]
+        return [(max(t, 0), min(r, w), min(b, h), max(l, 0)) for t, r, b, l in boxes]
+
+
+def load_detector(backend=None, scale=DETECTION_SCALE, tiles=None):
+    choice = (backend or os.environ.get("FACE_DETECTOR") or DEFAULT_DETECTOR).lower()
+    if choice not in BACKENDS:
+        raise ValueError(f"Unknown face detector '{choice}', expected one of {sorted(BACKENDS)}")
+    tiles = tiles or parse_tiles(os.environ.get("FACE_DETECTOR_TILES"))
+    detector = FaceDetector(BACKENDS[choice](), scale=scale, tiles=tiles)
+    print(f"[INFO] Face detector: {choice} at {scale:g}x" + (f", {tiles[0]}x{tiles[1]} tiles" if tiles else ""))
+    return detector
+
+
+# --- Speed / recall on the sample images ---
+def load_samples(folders=BENCHMARK_FOLDERS):
+    samples = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                img = cv2.imread(os.path.join(folder, filename))
+                if img is not None:
+                    samples.append((filename, cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
+    return samples
+
+
+def benchmark(scale=DETECTION_SCALE, tiles=(2, 2), folders=BENCHMARK_FOLDERS):
+    # Every sample image holds one face, so recall = images with a detection
+    samples = load_samples(folders)
+    if not samples:
+        print(f"[ERROR] No sample images in {folders}")
+        return
+    print(f"{len(samples)} images from {', '.join(folders)}, detection scale {scale:g}")
+    print(f"{'detector':<16}{'ms/image':>10}{'recall':>10}{'faces':>8}")
+    for name in DETECTOR_ORDER:
+        try:
+            backend = BACKENDS[name]()
+        except Exception as e:
+            print(f"[!] Face detector '{name}' unavailable: {e}")
+            continue
+        for grid in (None, tiles):
+            detector = FaceDetector(backend, scale=scale, tiles=grid)
+            detector.detect(samples[0][1])
+            timings, found, faces = [], 0, 0
+            for _, rgb in samples:
+                start = time.perf_counter()
+                boxes = detector.detect(rgb)
+                timings.append(time.perf_counter() - start)
+                found += bool(boxes)
+                faces += len(boxes)
+            label = name + (f" {grid[0]}x{grid[1]}" if grid else "")
+            print(f"{label:<16}{np.median(timings) * 1000:>10.1f}{found / len(samples):>10.0%}{faces:>8}")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        # The live scripts' scale first, then full resolution for comparison
+        scales = [float(sys.argv[sys.argv.index("--scale") + 1])] if "--scale" in sys.argv else [DETECTION_SCALE, 1.0]
+        for scale in scales:
+            benchmark(scale=scale)
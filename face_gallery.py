@@ -0,0 +1,175 @@
+import os
+import hashlib
+from multiprocessing import shared_memory
+import numpy as np
+import face_recognition
+from PIL import Image
+
+# Shared known_faces gallery with an on-disk encoding cache.
+# Every pipeline script loads the gallery through load_known_faces() so images
+# are only decoded and encoded again when they are added or changed.
+
+KNOWN_FACES_DIR = "known_faces"
+GALLERY_CACHE = "face_gallery.npz"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tiff", ".bmp")
+ENCODING_SIZE = 128
+
+
+def load_image_rgb_force(path):
+    img = Image.open(path).convert("RGB")         # Ensure RGB format
+    return np.array(img).astype(np.uint8)         # Ensure uint8 dtype
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_image(path):
+    try:
+        encodings = face_recognition.face_encodings(load_image_rgb_force(path))
+    except Exception as e:
+        print(f"[ERROR] Failed to encode {path}: {e}")
+        return None
+    if not encodings:
+        print(f"[!] No face found in: {path}")
+        return None
+    print(f"[✓] Encoded: {path}")
+    return encodings[0]
+
+
+# --- Binary cache store ---
+# One .npz with parallel arrays: the lookup key (path, size, mtime, sha1) and
+# the encoding row. Images without a face are kept with has_face=False so they
+# are not re-encoded on every start either.
+def read_cache(cache_path=GALLERY_CACHE):
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            return {
+                str(path): {
+                    "size": int(size),
+                    "mtime": int(mtime),
+                    "hash": str(digest),
+                    "name": str(name),
+                    "has_face": bool(has_face),
+                    "encoding": encoding,
+                }
+                for path, size, mtime, digest, name, has_face, encoding in zip(
+                    data["paths"], data["sizes"], data["mtimes"], data["hashes"],
+                    data["names"], data["has_face"], data["encodings"])
+            }
+    except Exception as e:
+        print(f"[!] Ignoring unreadable gallery cache {cache_path}: {e}")
+        return {}
+
+
+def write_cache(entries, cache_path=GALLERY_CACHE):
+    paths = sorted(entries)
+    rows = [entries[p] for p in paths]
+    encodings = np.zeros((len(rows), ENCODING_SIZE), dtype=np.float64)
+    for i, row in enumerate(rows):
+        if row["has_face"]:
+            encodings[i] = row["encoding"]
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        paths=np.array(paths, dtype=str),
+        sizes=np.array([r["size"] for r in rows], dtype=np.int64),
+        mtimes=np.array([r["mtime"] for r in rows], dtype=np.int64),
+        hashes=np.array([r["hash"] for r in rows], dtype=str),
+        names=np.array([r["name"] for r in rows], dtype=str),
+        has_face=np.array([r["has_face"] for r in rows], dtype=bool),
+        encodings=encodings,
+    )
+    os.replace(tmp_path, cache_path)
+
+
+def sync_gallery(folder=KNOWN_FACES_DIR, cache_path=GALLERY_CACHE):
+    cached = read_cache(cache_path)
+    entries = {}
+    changed = False
+
+    for filename in sorted(os.listdir(folder)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(folder, filename)
+        stat = os.stat(path)
+        entry = cached.get(path)
+
+        # Unchanged size + mtime: trust the cached encoding without reading the file
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            entries[path] = entry
+            continue
+
+        # Touched but identical content: only refresh the key
+        digest = file_hash(path)
+        changed = True
+        if entry and entry["hash"] == digest:
+            entry.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+            entries[path] = entry
+            continue
+
+        encoding = encode_image(path)
+        entries[path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": digest,
+            "name": os.path.splitext(filename)[0].upper(),
+            "has_face": encoding is not None,
+            "encoding": encoding,
+        }
+
+    removed = set(cached) - set(entries)
+    if removed:
+        changed = True
+        for path in sorted(removed):
+            print(f"[INFO] Dropped from gallery: {path}")
+
+    if changed:
+        write_cache(entries, cache_path)
+    return entries
+
+
+def load_known_faces(folder=KNOWN_FACES_DIR, cache_path=GALLERY_CACHE):
+    entries = sync_gallery(folder, cache_path)
+    rows = [entries[p] for p in sorted(entries) if entries[p]["has_face"]]
+    names = [row["name"] for row in rows]
+    if rows:
+        encodings = np.stack([row["encoding"] for row in rows])
+    else:
+        encodings = np.zeros((0, ENCODING_SIZE), dtype=np.float64)
+    print(f"[✓] Loaded known faces: {names}")
+    return encodings, names
+
+
+# --- Read-only gallery shared between worker processes ---
+# The parent loads the gallery once and copies the float32 matrix into shared
+# memory; workers map it without copying and build their FaceMatcher on it.
+def share_gallery(encodings, names):
+    matrix = np.ascontiguousarray(encodings, dtype=np.float32).reshape(len(names), ENCODING_SIZE)
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    np.ndarray(matrix.shape, dtype=np.float32, buffer=shm.buf)[:] = matrix
+    spec = {"shm_name": shm.name, "shape": matrix.shape, "names": list(names)}
+    return shm, spec
+
+
+def attach_gallery(spec):
+    shm = shared_memory.SharedMemory(name=spec["shm_name"])
+    try:
+        # Only the creating process should unlink the segment (POSIX tracker)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    encodings = np.ndarray(spec["shape"], dtype=np.float32, buffer=shm.buf)
+    encodings.flags.writeable = False
+    return shm, encodings, spec["names"]
+
+
+if __name__ == "__main__":
+    load_known_faces()
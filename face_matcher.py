@@ -0,0 +1,82 @@
+from collections import namedtuple
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Batched gallery matching.
+# The known encodings live in one contiguous float32 matrix with precomputed
+# squared norms, so every face in a frame is matched with a single matrix
+# product instead of compare_faces + face_distance per face. Large galleries
+# (ANN_THRESHOLD and up) switch to an hnswlib index when it is installed.
+
+TOLERANCE = 0.6          # Same default as face_recognition.compare_faces
+ANN_THRESHOLD = 5000
+TOP_K = 3
+ENCODING_SIZE = 128
+
+Match = namedtuple("Match", ["name", "distance", "candidates"])
+
+
+class FaceMatcher:
+    def __init__(self, encodings, names, tolerance=TOLERANCE, ann_threshold=ANN_THRESHOLD, top_k=TOP_K):
+        self.names = list(names)
+        self.matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(len(self.names), ENCODING_SIZE))
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.tolerance = tolerance
+        self.top_k = top_k
+        self.index = None
+        if ann_threshold is not None and len(self.names) >= ann_threshold:
+            self.index = self._build_ann_index()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _build_ann_index(self):
+        if hnswlib is None:
+            print(f"[!] hnswlib not installed, using exact matching for {len(self.names)} faces")
+            return None
+        index = hnswlib.Index(space="l2", dim=ENCODING_SIZE)
+        index.init_index(max_elements=len(self.names), ef_construction=200, M=16)
+        index.add_items(self.matrix, np.arange(len(self.names)))
+        index.set_ef(max(64, self.top_k * 4))
+        print(f"[INFO] Built ANN index for {len(self.names)} faces")
+        return index
+
+    def distances(self, face_encodings):
+        # Euclidean distances, shape (faces, gallery): |a|^2 + |b|^2 - 2ab
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        sq = np.einsum("ij,ij->i", queries, queries)[:, None] + self.sq_norms[None, :] - 2.0 * (queries @ self.matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq)
+
+    def _nearest(self, face_encodings, k):
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if self.index is not None:
+            labels, sq = self.index.knn_query(queries, k=k)
+            return labels, np.sqrt(np.maximum(sq, 0.0))
+        dist = self.distances(queries)
+        if k < dist.shape[1]:
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+        part_dist = np.take_along_axis(dist, part, axis=1)
+        order = np.argsort(part_dist, axis=1)
+        return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_dist, order, axis=1)
+
+    def match(self, face_encodings, top_k=None):
+        # One Match per face; name is None when the best distance is above tolerance
+        if len(face_encodings) == 0:
+            return []
+        if not self.names:
+            return [Match(None, float("inf"), []) for _ in face_encodings]
+        k = min(top_k or self.top_k, len(self.names))
+        labels, dists = self._nearest(face_encodings, k)
+        results = []
+        for row_labels, row_dists in zip(labels, dists):
+            candidates = [(self.names[i], float(d)) for i, d in zip(row_labels, row_dists)]
+            best_name, best_dist = candidates[0]
+            results.append(Match(best_name if best_dist <= self.tolerance else None, best_dist, candidates))
+        return results
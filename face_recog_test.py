@@ -1,3 +1,3 @@
-import face_recognition
-
-print("Face Recognition library is working!")
+import face_recognition
+
+print("Face Recognition library is working!")
@@ -0,0 +1,139 @@
+import itertools
+import numpy as np
+import face_recognition
+from geometry import iou_matrix, centroid_matrix
+from metrics import METRICS
+
+# Lightweight multi-face tracker.
+# Face boxes from consecutive frames are associated by IoU against each
+# track's predicted box (last box + smoothed velocity), falling back to
+# centroid distance for fast moves. Every track keeps the identity it was
+# last matched to plus a confidence that decays a little every frame; a
+# face is only encoded and matched again when its track is new or its
+# confidence has decayed below MIN_CONFIDENCE. Unknown faces are retried
+# every UNKNOWN_RETRY frames instead of on every frame.
+#
+# Boxes are (top, right, bottom, left), as returned by face_recognition.
+
+IOU_THRESHOLD = 0.3
+CENTROID_GATE = 0.6      # max centre distance, in face widths, for a fallback match
+MAX_MISSED = 5           # frames a track survives without a detection
+CONFIDENCE_DECAY = 0.02  # per frame
+WEAK_MATCH_PENALTY = 0.5 # confidence factor for centroid-only associations
+MIN_CONFIDENCE = 0.5
+UNKNOWN_RETRY = 10
+VELOCITY_SMOOTHING = 0.5
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.name = None
+        self.distance = None
+        self.confidence = 0.0
+        self.missed = 0
+        self.last_recognized = None   # frame index of the last encode + match
+
+    def predicted(self):
+        return self.box + self.velocity
+
+    def int_box(self):
+        return tuple(int(v) for v in self.box)
+
+
+def greedy_assign(score, valid, track_rows, det_cols, higher_is_better=True):
+    # Best pairs first; each track and detection used at most once
+    pairs = []
+    order = np.argsort(-score if higher_is_better else score, axis=None)
+    for flat in order:
+        t, d = np.unravel_index(flat, score.shape)
+        if not valid[t, d] or t in track_rows or d in det_cols:
+            continue
+        track_rows.add(t)
+        det_cols.add(d)
+        pairs.append((t, d))
+    return pairs
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_missed=MAX_MISSED,
+                 min_confidence=MIN_CONFIDENCE, unknown_retry=UNKNOWN_RETRY):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_confidence = min_confidence
+        self.unknown_retry = unknown_retry
+        self.tracks = []
+        self.frame = 0
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        # Associate this frame's boxes with tracks; returns one Track per box
+        self.frame += 1
+        detections = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        assigned = [None] * len(detections)
+
+        used_tracks, used_dets = set(), set()
+        if self.tracks and len(detections):
+            predicted = np.stack([t.predicted() for t in self.tracks])
+            iou = iou_matrix(predicted, detections)
+            strong = greedy_assign(iou, iou >= self.iou_threshold, used_tracks, used_dets)
+            dist = centroid_matrix(predicted, detections)
+            weak = greedy_assign(dist, dist <= CENTROID_GATE, used_tracks, used_dets, higher_is_better=False)
+            for pairs, penalty in ((strong, 1.0), (weak, WEAK_MATCH_PENALTY)):
+                for t, d in pairs:
+                    track = self.tracks[t]
+                    motion = detections[d] - track.box
+                    track.velocity = VELOCITY_SMOOTHING * motion + (1 - VELOCITY_SMOOTHING) * track.velocity
+                    track.box = detections[d]
+                    track.missed = 0
+                    track.confidence *= (1 - CONFIDENCE_DECAY) * penalty
+                    assigned[d] = track
+
+        # Unmatched tracks coast on their prediction until they expire
+        survivors = []
+        for i, track in enumerate(self.tracks):
+            if i not in used_tracks:
+                track.missed += 1
+                track.box = track.predicted()
+                track.confidence *= 1 - CONFIDENCE_DECAY
+            if track.missed <= self.max_missed:
+                survivors.append(track)
+        self.tracks = survivors
+
+        for d in range(len(detections)):
+            if assigned[d] is None:
+                track = Track(next(self._ids), detections[d])
+                self.tracks.append(track)
+                assigned[d] = track
+        return assigned
+
+    def needs_recognition(self, track):
+        if track.last_recognized is None:
+            return True
+        if track.name is None:
+            return self.frame - track.last_recognized >= self.unknown_retry
+        return track.confidence < self.min_confidence
+
+    def assign(self, track, match):
+        # match: face_matcher.Match for this track's face
+        # A known face that no longer matches becomes unknown and is retried
+        track.last_recognized = self.frame
+        track.name = match.name
+        track.distance = match.distance
+        track.confidence = 1.0 if match.name else 0.0
+
+    def recognize(self, tracks, matcher, rgb, locations):
+        # Encode + match only the faces whose tracks need it; returns those tracks.
+        # locations are the boxes in rgb's coordinates, aligned with tracks.
+        pending = [i for i, track in enumerate(tracks) if self.needs_recognition(track)]
+        if not pending:
+            return []
+        with METRICS.timed("encode"):
+            encodings = face_recognition.face_encodings(rgb, [locations[i] for i in pending])
+        with METRICS.timed("match"):
+            matches = matcher.match(encodings)
+        for i, match in zip(pending, matches):
+            self.assign(tracks[i], match)
+        return [tracks[i] for i in pending]
@@ -0,0 +1,236 @@
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+import cv2
+
+# Shared-memory frame bus.
+# One capture process opens the camera and publishes every frame into a
+# ring of slots in a named shared memory segment, together with its RGB
+# conversion and a downscaled RGB copy for detection. Any number of
+# consumer processes attach by name and read the newest frame as NumPy
+# views into the segment, so the camera is opened and decoded once no
+# matter how many scripts are running.
+#
+#   python frame_bus.py [source] [--name camera0] [--slots 8]
+#   CAMERA_SOURCE=bus:camera0 python mark_attendance.py
+#
+# Every slot carries the sequence number of the frame it holds (-1 while it
+# is being written). A consumer reads a view, uses it, then calls
+# still_valid() - if the producer lapped the ring in the meantime the
+# result belongs to a torn frame and should be dropped.
+
+BUS_NAME = "camera0"
+SLOTS = 8                 # ~250 ms of 30 fps video before a slow reader is lapped
+SMALL_SCALE = 0.25        # Matches face_detector.DETECTION_SCALE
+POLL_INTERVAL = 0.002     # seconds between checks for a newer frame
+ATTACH_TIMEOUT = 10.0     # seconds a consumer waits for the producer to appear
+HEADER_FIELDS = 8         # height, width, small_h, small_w, slots, latest_seq, closed, fps*1000
+H_HEIGHT, H_WIDTH, H_SMALL_H, H_SMALL_W, H_SLOTS, H_LATEST, H_CLOSED, H_FPS = range(HEADER_FIELDS)
+
+BusFrame = namedtuple("BusFrame", ["seq", "bgr", "rgb", "small"])
+
+
+def header_size(slots):
+    # Header fields plus one sequence number per slot, padded to a cache line
+    return -(-(HEADER_FIELDS + slots) * 8 // 64) * 64
+
+
+def slot_views(buf, header, slots, height, width, small_h, small_w):
+    offset = header_size(slots)
+    frame_bytes, small_bytes = height * width * 3, small_h * small_w * 3
+    views = []
+    for _ in range(slots):
+        bgr = np.ndarray((height, width, 3), dtype=np.uint8, buffer=buf, offset=offset)
+        rgb = np.ndarray((height, width, 3), dtype=np.uint8, buffer=buf, offset=offset + frame_bytes)
+        small = np.ndarray((small_h, small_w, 3), dtype=np.uint8, buffer=buf, offset=offset + 2 * frame_bytes)
+        views.append((bgr, rgb, small))
+        offset += 2 * frame_bytes + small_bytes
+    return views
+
+
+class FrameBus:
+    # Producer side; owns (and unlinks) the segment
+    def __init__(self, shape, name=BUS_NAME, slots=SLOTS, scale=SMALL_SCALE, fps=0.0):
+        height, width = shape[:2]
+        small_h, small_w = max(1, round(height * scale)), max(1, round(width * scale))
+        size = header_size(slots) + slots * (2 * height * width * 3 + small_h * small_w * 3)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.header[:] = 0
+        self.header[:HEADER_FIELDS] = [height, width, small_h, small_w, slots, 0, 0, int(fps * 1000)]
+        self.slot_seq = self.header[HEADER_FIELDS:]
+        self.slot_seq[:] = -1
+        self.slots = slot_views(self.shm.buf, self.header, slots, height, width, small_h, small_w)
+        self.seq = 0
+
+    def publish(self, frame):
+        seq = self.seq + 1
+        index = seq % len(self.slots)
+        bgr, rgb, small = self.slots[index]
+        self.slot_seq[index] = -1
+        np.copyto(bgr, frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        cv2.resize(rgb, (small.shape[1], small.shape[0]), dst=small, interpolation=cv2.INTER_AREA)
+        self.slot_seq[index] = seq
+        self.header[H_LATEST] = seq
+        self.seq = seq
+        return seq
+
+    def close(self):
+        self.header[H_CLOSED] = 1
+        del self.header, self.slot_seq, self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameBusReader:
+    # Consumer side; views stay valid only until the producer laps the ring
+    def __init__(self, name=BUS_NAME, timeout=ATTACH_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        try:
+            # Only the producer should unlink the segment (POSIX tracker)
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        except Exception:
+            pass
+        # The producer fills the header right after creating the segment
+        fields = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        while not np.all(fields[:H_LATEST] > 0):
+            if time.monotonic() > deadline:
+                del fields
+                self.shm.close()
+                raise TimeoutError(f"Frame bus {name!r} has no header yet")
+            time.sleep(0.01)
+        height, width, small_h, small_w, slots = (int(v) for v in fields[:H_LATEST])
+        del fields
+        self.header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.slot_seq = self.header[HEADER_FIELDS:]
+        self.slots = slot_views(self.shm.buf, self.header, slots, height, width, small_h, small_w)
+        for views in self.slots:
+            for view in views:
+                view.flags.writeable = False
+        self.fps = self.header[H_FPS] / 1000.0
+
+    @property
+    def closed(self):
+        return bool(self.header[H_CLOSED])
+
+    def latest(self):
+        # Newest complete frame, or None before the first publish
+        seq = int(self.header[H_LATEST])
+        if seq == 0:
+            return None
+        index = seq % len(self.slots)
+        if self.slot_seq[index] != seq:
+            return None
+        return BusFrame(seq, *self.slots[index])
+
+    def wait(self, after_seq=0, timeout=None):
+        # Block until a frame newer than after_seq is published (None on timeout/close)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            frame = self.latest()
+            if frame is not None and frame.seq > after_seq:
+                return frame
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+        return None
+
+    def still_valid(self, frame):
+        return self.slot_seq[frame.seq % len(self.slots)] == frame.seq
+
+    def close(self):
+        del self.header, self.slot_seq, self.slots
+        self.shm.close()
+
+
+class BusCapture:
+    # cv2.VideoCapture look-alike so FramePipeline can take "bus:<name>" as a source.
+    # Processors draw on their frame, so each read is a private BGR copy.
+    def __init__(self, name=BUS_NAME):
+        try:
+            self.reader = FrameBusReader(name)
+        except FileNotFoundError:
+            print(f"[ERROR] Frame bus {name!r} not found; start it with: python frame_bus.py --name {name}")
+            self.reader = None
+        except TimeoutError as e:
+            print(f"[ERROR] {e}")
+            self.reader = None
+        self.last_seq = 0
+
+    def isOpened(self):
+        return self.reader is not None
+
+    def read(self):
+        while self.reader is not None:
+            frame = self.reader.wait(self.last_seq)
+            if frame is None:
+                return False, None
+            bgr = frame.bgr.copy()
+            if self.reader.still_valid(frame):
+                self.last_seq = frame.seq
+                return True, bgr
+        return False, None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS and self.reader is not None:
+            return self.reader.fps
+        return 0.0
+
+    def release(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+def run_producer(source=0, name=BUS_NAME, slots=SLOTS):
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print(f"[ERROR] Could not open video source {source}")
+        return
+    bus = None
+    count, report_time = 0, time.monotonic()
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                print("[INFO] Capture ended")
+                break
+            if bus is None:
+                try:
+                    bus = FrameBus(frame.shape, name, slots, fps=cap.get(cv2.CAP_PROP_FPS) or 0.0)
+                except FileExistsError:
+                    print(f"[ERROR] Frame bus {name!r} already exists (another producer, or left over from a crash)")
+                    return
+                print(f"[✓] Publishing {frame.shape[1]}x{frame.shape[0]} frames on bus {name!r} ({slots} slots)")
+            bus.publish(frame)
+            count += 1
+            if time.monotonic() - report_time >= 10:
+                print(f"[INFO] {count / (time.monotonic() - report_time):.1f} fps published")
+                count, report_time = 0, time.monotonic()
+    except KeyboardInterrupt:
+        print("[INFO] Interrupted")
+    finally:
+        cap.release()
+        if bus is not None:
+            bus.close()
+
+
+if __name__ == "__main__":
+    from orchestrator import parse_source
+    args = sys.argv[1:]
+    name = args[args.index("--name") + 1] if "--name" in args else BUS_NAME
+    slots = int(args[args.index("--slots") + 1]) if "--slots" in args else SLOTS
+    positional = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or args[i - 1] not in ("--name", "--slots"))]
+    run_producer(parse_source(positional[0]) if positional else 0, name, slots)
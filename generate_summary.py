@@ -1,85 +1,199 @@
-import json
-import os
-from collections import defaultdict
-from datetime import datetime
-
-# Load today's date
-today = datetime.now().date()
-today_str = today.strftime("%Y-%m-%d")
-
-# Load Attendance
-attendance = []
-if os.path.exists("attendance.csv"):
-    with open("attendance.csv", "r") as f:
-        for line in f:
-            name, timestamp = line.strip().split(",")
-            timestamp_date = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").date()
-            if timestamp_date == today:
-                attendance.append(name.upper())
-
-# Load Emotion Logs
-emotion_data = defaultdict(list)
-if os.path.exists("emotion_log.json"):
-    with open("emotion_log.json", "r") as f:
-        emotions = json.load(f)
-        for entry in emotions:
-            entry_date = datetime.strptime(entry["timestamp"], "%Y-%m-%d %H:%M:%S").date()
-            if entry_date == today and entry["emotion"] != "Neutral":
-                emotion_data[entry["name"]].append(entry["emotion"])
-
-# Load Engagement Logs (Hand Raises)
-hand_raises = defaultdict(int)
-if os.path.exists("engagement_log.json"):
-    with open("engagement_log.json", "r") as f:
-        engagements = json.load(f)
-        for entry in engagements:
-            entry_date = datetime.strptime(entry["timestamp"], "%Y-%m-%d %H:%M:%S").date()
-            if entry["event"] == "hand_raise" and entry_date == today:
-                name = entry["student"].upper()
-                hand_raises[name] += 1
-
-# ✅ Generate Summary
-now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-summary = f"📋 **Class Session Summary**\n🕒 Date: {now_str}\n\n"
-
-# Attendance Section
-summary += "✅ Attendance:\n"
-if attendance:
-    for name in attendance:
-        summary += f"- {name}\n"
-else:
-    summary += "- No attendance recorded today.\n"
-
-# Emotions Section
-summary += "\n😊 Emotions Detected:\n"
-if emotion_data:
-    for name, emotions in emotion_data.items():
-        counts = defaultdict(int)
-        for emotion in emotions:
-            counts[emotion] += 1
-        emotion_summary = ', '.join([f"{emo} ({count})" for emo, count in counts.items()])
-        summary += f"- {name}: {emotion_summary}\n"
-else:
-    summary += "- No emotional events logged today.\n"
-
-# Hand Raises Section
-summary += "\n🙋 Engagement (Hand Raises):\n"
-if hand_raises:
-    for name, count in hand_raises.items():
-        summary += f"- {name}: {count} time(s)\n"
-else:
-    summary += "- No hand raises logged today.\n"
-
-# ✅ Save summary in Summaries folder
-os.makedirs("Summaries", exist_ok=True)
-summary_filename = f"Summaries/{today_str}.txt"
-
-if not os.path.exists(summary_filename):
-    with open(summary_filename, "w", encoding="utf-8") as f:
-        f.write(summary)
-    print(f"[✓] Summary saved to {summary_filename}")
-else:
-    print(f"[!] Summary for today already exists: {summary_filename}")
-
-# ✅ Optional: Print summary to console
-print("\n" + summary)
+import os
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+from event_store import connect, daily_attendance, daily_counts, rollup_rows, ATTENDANCE, EMOTION, HAND_RAISE
+
+# Daily class summary from the event store's per-day rollups.
+# The rollups are kept current as events arrive, so the summary can be
+# regenerated at any point during the class; an existing summary file for
+# the day is updated in place.
+#
+#   python generate_summary.py [YYYY-MM-DD]
+#
+# Backfill: one pass over the rollups of a date range writes
+# Summaries/<date>.txt for every day with events, plus a cross-day report
+# (attendance rate, emotion distribution, weekly hand raises per student)
+# in Summaries/report_<start>_<end>.txt.
+#
+#   python generate_summary.py --range 2025-06-01 2025-07-31
+
+SUMMARIES_DIR = "Summaries"
+DATE_FORMAT = "%Y-%m-%d"
+USAGE = "Usage: python generate_summary.py [YYYY-MM-DD] | --range YYYY-MM-DD YYYY-MM-DD"
+
+
+def valid_date(date_str):
+    try:
+        datetime.strptime(date_str, DATE_FORMAT)
+        return True
+    except ValueError:
+        return False
+
+
+def load_day(conn, date_str):
+    # Load Attendance
+    attendance = [name.upper() for name in daily_attendance(conn, date_str)]
+
+    # Load Emotion Logs (per student: emotion -> count)
+    emotion_data = {}
+    for name, counts in daily_counts(conn, date_str, EMOTION).items():
+        counts = {emo: count for emo, count in counts.items() if emo != "Neutral"}
+        if counts:
+            emotion_data[name] = counts
+
+    # Load Engagement Logs (Hand Raises)
+    hand_raises = {}
+    for name, count in daily_counts(conn, date_str, HAND_RAISE).items():
+        hand_raises[name.upper()] = hand_raises.get(name.upper(), 0) + count
+    return attendance, emotion_data, hand_raises
+
+
+def group_days(rows):
+    # Rollup rows ordered by date -> (date, attendance, emotion_data, hand_raises) per day
+    date_str, day = None, None
+    for row in rows:
+        if row["date"] != date_str:
+            if day is not None:
+                yield (date_str, *day)
+            date_str, day = row["date"], ([], {}, {})
+        attendance, emotion_data, hand_raises = day
+        name = row["student"].upper() if row["event"] != EMOTION else row["student"]
+        if row["event"] == ATTENDANCE and name not in attendance:
+            attendance.append(name)
+        elif row["event"] == EMOTION and row["value"] != "Neutral":
+            emotion_data.setdefault(name, {})[row["value"]] = row["count"]
+        elif row["event"] == HAND_RAISE:
+            hand_raises[name] = hand_raises.get(name, 0) + row["count"]
+    if day is not None:
+        yield (date_str, *day)
+
+
+def build_summary(date_label, attendance, emotion_data, hand_raises):
+    summary = f"📋 **Class Session Summary**\n🕒 Date: {date_label}\n\n"
+
+    # Attendance Section
+    summary += "✅ Attendance:\n"
+    if attendance:
+        for name in attendance:
+            summary += f"- {name}\n"
+    else:
+        summary += "- No attendance recorded today.\n"
+
+    # Emotions Section
+    summary += "\n😊 Emotions Detected:\n"
+    if emotion_data:
+        for name, counts in emotion_data.items():
+            emotion_summary = ', '.join([f"{emo} ({count})" for emo, count in counts.items()])
+            summary += f"- {name}: {emotion_summary}\n"
+    else:
+        summary += "- No emotional events logged today.\n"
+
+    # Hand Raises Section
+    summary += "\n🙋 Engagement (Hand Raises):\n"
+    if hand_raises:
+        for name, count in hand_raises.items():
+            summary += f"- {name}: {count} time(s)\n"
+    else:
+        summary += "- No hand raises logged today.\n"
+    return summary
+
+
+def save_summary(date_str, summary):
+    # ✅ Save summary in Summaries folder (replacing an earlier version of the day)
+    os.makedirs(SUMMARIES_DIR, exist_ok=True)
+    summary_filename = os.path.join(SUMMARIES_DIR, f"{date_str}.txt")
+    existed = os.path.exists(summary_filename)
+    tmp_filename = summary_filename + ".tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        f.write(summary)
+    os.replace(tmp_filename, summary_filename)
+    print(f"[✓] Summary {'updated in' if existed else 'saved to'} {summary_filename}")
+    return summary_filename
+
+
+def build_report(start, end, days):
+    # Cross-day rollups from the per-day data of build_range
+    class_days = [d for d, attendance, _, _ in days if attendance] or [d for d, _, _, _ in days]
+    present, emotions, weekly = Counter(), defaultdict(Counter), defaultdict(Counter)
+    for date_str, attendance, emotion_data, hand_raises in days:
+        present.update(attendance)
+        for name, counts in emotion_data.items():
+            emotions[name].update(counts)
+        week = datetime.strptime(date_str, DATE_FORMAT).strftime("%G-W%V")
+        for name, count in hand_raises.items():
+            weekly[name][week] += count
+
+    report = f"📊 **Class Report**\n🕒 {start} → {end}\n📅 Class days: {len(class_days)}\n\n"
+
+    report += "✅ Attendance Rate:\n"
+    for name, count in present.most_common():
+        report += f"- {name}: {count}/{len(class_days)} days ({count / max(len(class_days), 1):.0%})\n"
+    if not present:
+        report += "- No attendance recorded.\n"
+
+    report += "\n😊 Emotion Distribution:\n"
+    for name, counts in emotions.items():
+        total = sum(counts.values())
+        distribution = ', '.join(f"{emo} {count / total:.0%}" for emo, count in counts.most_common())
+        report += f"- {name}: {distribution} ({total} events)\n"
+    if not emotions:
+        report += "- No emotional events logged.\n"
+
+    report += "\n🙋 Hand Raises per Week:\n"
+    for name, weeks in weekly.items():
+        trend = ', '.join(f"{week}: {count}" for week, count in sorted(weeks.items()))
+        report += f"- {name}: {trend}\n"
+    if not weekly:
+        report += "- No hand raises logged.\n"
+    return report
+
+
+def build_range(conn, start, end):
+    # One streaming pass: write each day's summary and keep its (small) rollup for the report
+    days = []
+    for date_str, attendance, emotion_data, hand_raises in group_days(rollup_rows(conn, start, end)):
+        save_summary(date_str, build_summary(date_str, attendance, emotion_data, hand_raises))
+        days.append((date_str, attendance, emotion_data, hand_raises))
+    report = build_report(start, end, days)
+    os.makedirs(SUMMARIES_DIR, exist_ok=True)
+    report_filename = os.path.join(SUMMARIES_DIR, f"report_{start}_{end}.txt")
+    with open(report_filename, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(f"[✓] {len(days)} daily summaries, report saved to {report_filename}")
+    return report
+
+
+if __name__ == "__main__":
+    if "--range" in sys.argv:
+        dates = sys.argv[sys.argv.index("--range") + 1:][:2]
+        if len(dates) < 2 or not all(valid_date(d) for d in dates):
+            print(f"[ERROR] --range needs a start and an end date as YYYY-MM-DD, got {' '.join(dates) or 'nothing'}")
+            print(USAGE)
+            sys.exit(1)
+        start, end = dates
+        if start > end:
+            print(f"[ERROR] Range start {start} is after its end {end}")
+            print(USAGE)
+            sys.exit(1)
+        conn = connect()
+        print("\n" + build_range(conn, start, end))
+        conn.close()
+        sys.exit(0)
+
+    now = datetime.now()
+    date_str = sys.argv[1] if len(sys.argv) > 1 else now.strftime(DATE_FORMAT)
+    if not valid_date(date_str):
+        print(f"[ERROR] Invalid date {date_str!r}")
+        print(USAGE)
+        sys.exit(1)
+    # Today's summary is stamped with the generation time, past days with their date
+    date_label = now.strftime("%Y-%m-%d %H:%M:%S") if date_str == now.strftime("%Y-%m-%d") else date_str
+
+    conn = connect()
+    summary = build_summary(date_label, *load_day(conn, date_str))
+    conn.close()
+    save_summary(date_str, summary)
+
+    # ✅ Optional: Print summary to console
+    print("\n" + summary)
@@ -0,0 +1,28 @@
+import numpy as np
+
+# Box geometry shared by the detector and the tracker.
+# Kept free of face_recognition/dlib so the Haar and YuNet detector
+# backends import without it.
+#
+# Boxes are (top, right, bottom, left), as returned by face_recognition.
+
+
+def iou_matrix(a, b):
+    # a: (N, 4), b: (M, 4) boxes as (top, right, bottom, left)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(bottom - top, 0, None) * np.clip(right - left, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 1] - a[:, 3])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 1] - b[:, 3])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def centroid_matrix(a, b):
+    # Centre distance in units of the track's face width
+    ca = np.stack([(a[:, 0] + a[:, 2]) / 2, (a[:, 1] + a[:, 3]) / 2], axis=1)
+    cb = np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2], axis=1)
+    width = np.maximum(a[:, 1] - a[:, 3], 1.0)
+    return np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=2) / width[:, None]
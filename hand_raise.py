@@ -0,0 +1,112 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import mediapipe as mp
+from metrics import METRICS
+
+# Multi-person hand-raise detection.
+# A full-frame mp.solutions.pose.Pose only tracks one body, so instead every
+# recognized face gets its own body ROI (around and below the face, with
+# room above the head for a raised arm). Each ROI is downscaled to at most
+# ROI_MAX_SIDE and run through the lightweight pose model (complexity 0) on
+# a small thread pool, so cost per student stays flat and the raise is
+# credited to the face that owns the ROI.
+
+mp_pose = mp.solutions.pose
+mp_drawing = mp.solutions.drawing_utils
+
+POSE_WORKERS = 4
+ROI_MAX_SIDE = 256
+VISIBILITY = 0.5
+# ROI size in face widths/heights around the face box
+ROI_WIDTH = 4.0
+ROI_ABOVE = 2.0
+ROI_BELOW = 3.0
+
+HandRaise = namedtuple("HandRaise", ["raised", "roi", "landmarks"])
+
+
+def body_roi(face_box, frame_shape):
+    top, right, bottom, left = face_box
+    face_w, face_h = right - left, bottom - top
+    center_x = (left + right) / 2
+    h, w = frame_shape[:2]
+    return (
+        max(int(top - ROI_ABOVE * face_h), 0),
+        min(int(center_x + ROI_WIDTH / 2 * face_w), w),
+        min(int(bottom + ROI_BELOW * face_h), h),
+        max(int(center_x - ROI_WIDTH / 2 * face_w), 0),
+    )
+
+
+def is_hand_raised(landmarks):
+    # Either wrist above its shoulder, ignoring landmarks the model can't see
+    lm = landmarks.landmark
+    for wrist, shoulder in ((mp_pose.PoseLandmark.RIGHT_WRIST, mp_pose.PoseLandmark.RIGHT_SHOULDER),
+                            (mp_pose.PoseLandmark.LEFT_WRIST, mp_pose.PoseLandmark.LEFT_SHOULDER)):
+        if lm[wrist].visibility >= VISIBILITY and lm[shoulder].visibility >= VISIBILITY and lm[wrist].y < lm[shoulder].y:
+            return True
+    return False
+
+
+def draw_hand_raise(frame, result):
+    if result.landmarks is None:
+        return
+    top, right, bottom, left = result.roi
+    # Landmarks are relative to the ROI, so draw into a view of that region
+    mp_drawing.draw_landmarks(frame[top:bottom, left:right], result.landmarks, mp_pose.POSE_CONNECTIONS)
+    if result.raised:
+        cv2.rectangle(frame, (left, top), (right, bottom), (0, 200, 255), 2)
+
+
+class HandRaiseDetector:
+    # Can be shared by several processors (the monitor service runs one for
+    # all modes); with a pool, only the pool threads ever hold Pose graphs.
+    def __init__(self, workers=POSE_WORKERS):
+        # Pose graphs are not thread-safe, so every pool thread gets its own
+        self.local = threading.local()
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def _pose(self):
+        if not hasattr(self.local, "pose"):
+            self.local.pose = mp_pose.Pose(static_image_mode=True, model_complexity=0)
+        return self.local.pose
+
+    def warm(self):
+        # Build every Pose graph now instead of on the first frames
+        if self.pool is None:
+            self._pose()
+            return
+        # The barrier keeps each task on its own pool thread
+        barrier = threading.Barrier(self.workers)
+
+        def build(_):
+            self._pose()
+            barrier.wait()
+        list(self.pool.map(build, range(self.workers)))
+
+    def _check(self, rgb, face_box):
+        roi = body_roi(face_box, rgb.shape)
+        top, right, bottom, left = roi
+        if bottom <= top or right <= left:
+            return HandRaise(False, roi, None)
+        crop = rgb[top:bottom, left:right]
+        scale = ROI_MAX_SIDE / max(crop.shape[:2])
+        if scale < 1:
+            crop = cv2.resize(crop, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        landmarks = self._pose().process(np.ascontiguousarray(crop)).pose_landmarks
+        return HandRaise(landmarks is not None and is_hand_raised(landmarks), roi, landmarks)
+
+    def detect(self, rgb, face_boxes):
+        # One HandRaise per face box, in the same order
+        with METRICS.timed("pose"):
+            if self.pool is not None and face_boxes:
+                return list(self.pool.map(lambda box: self._check(rgb, box), face_boxes))
+            return [self._check(rgb, box) for box in face_boxes]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
@@ -1,117 +1,95 @@
-import cv2
-import numpy as np
-import face_recognition
-import os
-from datetime import datetime
-from PIL import Image
-
-# Load known faces from folder
-def load_image_rgb_force(path):
-    img = Image.open(path).convert("RGB")         # Ensure RGB format
-    arr = np.array(img).astype(np.uint8)          # Ensure uint8 dtype
-    return arr
-
-def find_encodings(images):
-    encode_list = []
-    for img, name in images:
-        try:
-            img_rgb = img.astype(np.uint8)
-            encodings = face_recognition.face_encodings(img_rgb)
-            if encodings:
-                encode_list.append((encodings[0], name))
-                print(f"[✓] Encoded: {name}")
-            else:
-                print(f"[!] No face found in: {name}")
-        except Exception as e:
-            print(f"[ERROR] Failed to encode {name}: {e}")
-    return encode_list
-
-def mark_attendance(name):
-    now = datetime.now()
-    current_date = now.strftime('%Y-%m-%d')
-    dt_string = now.strftime('%Y-%m-%d %H:%M:%S')
-
-    already_marked_today = False
-
-    # Read existing entries
-    if os.path.exists('attendance.csv'):
-        with open('attendance.csv', 'r') as f:
-            for line in f:
-                entry_name, timestamp = line.strip().split(',')
-                entry_date = timestamp.split(' ')[0]
-                if entry_name == name and entry_date == current_date:
-                    already_marked_today = True
-                    break
-
-    # Write if not marked today
-    if not already_marked_today:
-        with open('attendance.csv', 'a') as f:
-            f.write(f'{name},{dt_string}\n')
-        print(f"[✓] Marked attendance for: {name}")
-    else:
-        print(f"[⏳] Already marked today: {name}")
-
-
-# Load all images from known_faces
-path = 'known_faces'
-images = []
-class_names = []
-
-print("[INFO] Loading known faces...")
-for file in os.listdir(path):
-    full_path = os.path.join(path, file)
-    try:
-        image = load_image_rgb_force(full_path)
-        images.append((image, os.path.splitext(file)[0]))
-        print(f"[✓] Loaded {file}, dtype={image.dtype}, shape={image.shape}")
-    except Exception as e:
-        print(f"[ERROR] Could not load {file}: {e}")
-
-# Encode known faces
-encode_list_known = find_encodings(images)
-print("[INFO] Encoding complete")
-
-# Start webcam
-print("[INFO] Starting webcam...")
-cap = cv2.VideoCapture(0)
-
-while True:
-    success, frame = cap.read()
-    if not success:
-        print("[ERROR] Failed to capture frame from webcam")
-        break
-
-    small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-    rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB).astype(np.uint8)
-
-    try:
-        faces_current_frame = face_recognition.face_locations(rgb_small_frame)
-        encodes_current_frame = face_recognition.face_encodings(rgb_small_frame, faces_current_frame)
-
-        for encode_face, face_loc in zip(encodes_current_frame, faces_current_frame):
-            matches = face_recognition.compare_faces([enc[0] for enc in encode_list_known], encode_face)
-            face_dist = face_recognition.face_distance([enc[0] for enc in encode_list_known], encode_face)
-            match_index = np.argmin(face_dist)
-
-            if matches[match_index]:
-                name = encode_list_known[match_index][1].upper()
-                print(f"[INFO] Match found: {name}")
-                mark_attendance(name)
-
-                # ✅ Write to current_person.txt
-                with open("current_person.txt", "w") as f:
-                    f.write(name)
-
-                y1, x2, y2, x1 = face_loc
-                y1, x2, y2, x1 = y1*4, x2*4, y2*4, x1*4
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
-                cv2.putText(frame, name, (x1+6, y2-6), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
-    except Exception as e:
-        print(f"[ERROR] Face processing failed: {e}")
-
-    cv2.imshow('Webcam', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+import cv2
+from datetime import datetime
+from face_gallery import load_known_faces
+from face_matcher import FaceMatcher
+from event_store import EventStore
+from face_tracker import FaceTracker
+from face_detector import load_detector
+from motion_gate import MotionGate, draw_rate
+from pipeline import FramePipeline, show_window, default_source
+
+
+class AttendanceProcessor:
+    def __init__(self, matcher=None, attendance_store=None, clock=datetime.now, current_person_path="current_person.txt",
+                 motion_gate=None, detector=None):
+        if matcher is None:
+            # Load known faces (cached encodings, only new/changed images are re-encoded)
+            print("[INFO] Loading known faces...")
+            matcher = FaceMatcher(*load_known_faces())
+            print("[INFO] Encoding complete")
+        self.matcher = matcher
+        # Today's marks are kept in memory; new ones go to the event store in batches.
+        # A store created here is closed by close().
+        self.event_store = None
+        if attendance_store is None:
+            self.event_store = EventStore()
+            attendance_store = self.event_store.attendance()
+        self.attendance_store = attendance_store
+        self.clock = clock
+        self.current_person_path = current_person_path
+        self.detector = detector or load_detector()
+        self.tracker = FaceTracker()
+        # Detection only runs when the scene changes (or on the idle heartbeat)
+        self.motion_gate = motion_gate or MotionGate()
+        self.labels = []   # (box, name) drawn until the next analysed frame
+
+    def mark_attendance(self, name):
+        if self.attendance_store.mark(name, self.clock()):
+            print(f"[✓] Marked attendance for: {name}")
+        else:
+            print(f"[⏳] Already marked today: {name}")
+
+    def draw(self, frame):
+        for (y1, x2, y2, x1), name in self.labels:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
+            cv2.putText(frame, name, (x1+6, y2-6), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
+        draw_rate(frame, self.motion_gate)
+
+    def process(self, frame):
+        if not self.motion_gate.check(frame):
+            self.draw(frame)
+            self.attendance_store.maybe_flush()
+            return frame
+
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        try:
+            # Detection runs downscaled; boxes come back in frame coordinates
+            faces_current_frame = self.detector.detect(rgb_frame)
+            tracks = self.tracker.update(faces_current_frame)
+
+            # Encode and match (one batch) only new faces and tracks whose identity went stale
+            for track in self.tracker.recognize(tracks, self.matcher, rgb_frame, faces_current_frame):
+                if track.name:
+                    name = track.name
+                    print(f"[INFO] Match found: {name}")
+                    self.mark_attendance(name)
+
+                    # ✅ Write to current_person.txt
+                    if self.current_person_path:
+                        with open(self.current_person_path, "w") as f:
+                            f.write(name)
+
+            self.labels = [(face_loc, track.name)
+                           for track, face_loc in zip(tracks, faces_current_frame) if track.name]
+        except Exception as e:
+            print(f"[ERROR] Face processing failed: {e}")
+
+        self.draw(frame)
+        self.attendance_store.maybe_flush()
+        return frame
+
+    def close(self):
+        self.attendance_store.close()
+        if self.event_store is not None:
+            self.event_store.close()
+
+
+if __name__ == "__main__":
+    processor = AttendanceProcessor()
+
+    # Start webcam
+    print("[INFO] Starting webcam...")
+    FramePipeline(processor.process, show_window("Webcam"), source=default_source()).run()
+    processor.close()
+    cv2.destroyAllWindows()
@@ -0,0 +1,281 @@
+import os
+import re
+import sys
+import time
+import atexit
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Always-on hot-path metrics.
+# Stages time themselves into fixed-bucket histograms (two perf_counter
+# calls and a bucket increment per call), the pipeline counts frames and
+# drops, and queue depths are sampled when the metrics are written. A
+# background thread writes everything every few seconds in the Prometheus
+# text format to metrics/<process>.prom - readable by the node_exporter
+# textfile collector and by the Streamlit dashboard.
+#
+# A thread can bind labels (METRICS.bind(mode="session")) that are added to
+# everything it records, so the monitor service's modes, which share the
+# same detector/tracker/FER code, show up separately.
+
+METRICS_DIR = "metrics"
+FLUSH_INTERVAL = 5.0      # seconds between metric file writes
+STALE_AFTER = 30.0        # the dashboard ignores files older than this
+PREFIX = "smartclass"
+STAGE_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)   # seconds
+FACE_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)    # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def bucket_quantile(q, bounds, cumulative):
+    # Prometheus-style estimate: linear interpolation inside the bucket holding the q-th value
+    total = cumulative[-1]
+    if not total:
+        return None
+    rank = q * total
+    lower, below = 0.0, 0
+    for bound, count in zip(bounds, cumulative):
+        if count >= rank:
+            if bound == float("inf"):
+                return lower
+            inside = count - below
+            return lower + (bound - lower) * ((rank - below) / inside if inside else 1.0)
+        lower, below = bound, count
+    return lower
+
+
+def label_text(labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stages = {}          # (stage, labels) -> Histogram
+        self.faces = {}           # labels -> Histogram
+        self.counters = {}
+        self.gauge_callbacks = {}
+        self.last_render = (time.monotonic(), {})
+
+    def bind(self, **labels):
+        # Labels added to everything the calling thread records from now on
+        self.local.labels = tuple(sorted(labels.items()))
+
+    def _labels(self, labels=None):
+        bound = getattr(self.local, "labels", ())
+        if not labels:
+            return bound
+        return tuple(sorted({**dict(bound), **labels}.items()))
+
+    def observe(self, stage, seconds):
+        key = (stage, self._labels())
+        with self.lock:
+            histogram = self.stages.get(key)
+            if histogram is None:
+                histogram = self.stages[key] = Histogram(STAGE_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe_faces(self, count):
+        key = self._labels()
+        with self.lock:
+            histogram = self.faces.get(key)
+            if histogram is None:
+                histogram = self.faces[key] = Histogram(FACE_BUCKETS)
+            histogram.observe(count)
+
+    def count(self, name, n=1, **labels):
+        key = (name, self._labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def track(self, name, fn, **labels):
+        # fn() is sampled at every write, e.g. a queue's qsize
+        self.gauge_callbacks[(name, self._labels(labels))] = fn
+
+    def render(self):
+        now = time.monotonic()
+        gauges = {}
+        with self.lock:
+            counters = dict(self.counters)
+            stages = {key: (list(h.counts), h.sum, h.count) for key, h in self.stages.items()}
+            faces = {labels: (list(h.counts), h.sum, h.count) for labels, h in self.faces.items()}
+        for key, fn in list(self.gauge_callbacks.items()):
+            try:
+                gauges[key] = fn()
+            except Exception:
+                pass
+        # Effective FPS per frame counter since the previous write
+        last_time, last_counters = self.last_render
+        elapsed = now - last_time
+        for (name, labels), value in counters.items():
+            if name == "frames" and elapsed > 0:
+                gauges[("fps", labels)] = round((value - last_counters.get((name, labels), 0)) / elapsed, 2)
+        self.last_render = (now, counters)
+        gauges[("last_write_timestamp_seconds", ())] = round(time.time(), 3)
+
+        lines = []
+        for (name, labels), value in sorted(counters.items()):
+            lines.append(f"{PREFIX}_{name}_total{label_text(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            lines.append(f"{PREFIX}_{name}{label_text(labels)} {value}")
+        for (stage, labels), (counts, total, count) in sorted(stages.items()):
+            lines += histogram_lines(f"{PREFIX}_stage_seconds", (("stage", stage),) + labels, STAGE_BUCKETS,
+                                     counts, total, count)
+        for labels, (counts, total, count) in sorted(faces.items()):
+            lines += histogram_lines(f"{PREFIX}_faces_per_frame", labels, FACE_BUCKETS, counts, total, count)
+        return "\n".join(lines) + "\n"
+
+
+def histogram_lines(name, labels, buckets, counts, total, count):
+    lines, cumulative = [], 0
+    for bound, n in zip(list(buckets) + ["+Inf"], counts):
+        cumulative += n
+        lines.append(f"{name}_bucket{label_text(labels + (('le', bound),))} {cumulative}")
+    lines.append(f"{name}_sum{label_text(labels)} {round(total, 6)}")
+    lines.append(f"{name}_count{label_text(labels)} {count}")
+    return lines
+
+
+METRICS = Registry()
+timed = METRICS.timed
+
+
+# --- Export: one file per process, rewritten atomically ---
+_exporter = None
+
+
+def start_exporter(name=None, directory=METRICS_DIR, interval=FLUSH_INTERVAL):
+    # Idempotent; the first caller names the file
+    global _exporter
+    if _exporter is not None:
+        return _exporter
+    name = name or f"{os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]}_{os.getpid()}"
+    path = os.path.join(directory, f"{name}.prom")
+    stop_event = threading.Event()
+
+    def write():
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(METRICS.render())
+        os.replace(tmp_path, path)
+
+    def loop():
+        while not stop_event.wait(interval):
+            try:
+                write()
+            except OSError as e:
+                print(f"[!] Could not write metrics to {path}: {e}")
+
+    def stop():
+        stop_event.set()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    threading.Thread(target=loop, name="metrics", daemon=True).start()
+    atexit.register(stop)
+    _exporter = path
+    return path
+
+
+# --- Reading (dashboard) ---
+LINE_PATTERN = re.compile(r'^(\w+)(?:\{(.*)\})?\s+(\S+)$')
+LABEL_PATTERN = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_prometheus(text):
+    samples = []
+    for line in text.splitlines():
+        match = LINE_PATTERN.match(line.strip())
+        if match:
+            name, labels, value = match.groups()
+            samples.append((name, dict(LABEL_PATTERN.findall(labels or "")), float(value)))
+    return samples
+
+
+def summarize_process(samples):
+    # Flatten one process's samples into what the dashboard shows
+    summary = {"fps": {}, "frames": {}, "queues": {}, "stages": {}, "faces_mean": None, "updated": None}
+    buckets = {}
+    faces = {}
+    for name, labels, value in samples:
+        short = name[len(PREFIX) + 1:]
+        if short == "fps":
+            summary["fps"][labels.get("kind", "")] = value
+        elif short == "frames_total":
+            summary["frames"][labels.get("kind", "")] = int(value)
+        elif short == "queue_depth":
+            summary["queues"][labels.get("queue", "")] = int(value)
+        elif short == "last_write_timestamp_seconds":
+            summary["updated"] = value
+        elif short == "stage_seconds_bucket":
+            le = float("inf") if labels["le"] == "+Inf" else float(labels["le"])
+            buckets.setdefault(labels["stage"], []).append((le, value))
+        elif short in ("stage_seconds_sum", "stage_seconds_count"):
+            summary["stages"].setdefault(labels["stage"], {})[short.rsplit("_", 1)[1]] = value
+        elif short in ("faces_per_frame_sum", "faces_per_frame_count"):
+            faces[short.rsplit("_", 1)[1]] = value
+    for stage, stats in summary["stages"].items():
+        points = sorted(buckets.get(stage, []))
+        bounds, cumulative = [b for b, _ in points], [c for _, c in points]
+        count = int(stats.get("count", 0))
+        p95 = bucket_quantile(0.95, bounds, cumulative) if count else None
+        summary["stages"][stage] = {
+            "calls": count,
+            "mean_ms": round(stats.get("sum", 0.0) / count * 1000, 2) if count else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "total_s": round(stats.get("sum", 0.0), 1),
+        }
+    if faces.get("count"):
+        summary["faces_mean"] = round(faces["sum"] / faces["count"], 2)
+    return summary
+
+
+def split_by_mode(samples):
+    # {mode or None: samples}; samples without a mode label stay with the process
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample[1].get("mode"), []).append(sample)
+    return groups
+
+
+def read_metrics(directory=METRICS_DIR, stale_after=STALE_AFTER):
+    # {process name (or "process / mode"): summary} for every metrics file written recently
+    processes = {}
+    if not os.path.isdir(directory):
+        return processes
+    now = time.time()
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if not filename.endswith(".prom") or now - os.path.getmtime(path) > stale_after:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            samples = parse_prometheus(f.read())
+        process_name = filename[:-len(".prom")]
+        for mode, group in sorted(split_by_mode(samples).items(), key=lambda kv: kv[0] or ""):
+            processes[f"{process_name} / {mode}" if mode else process_name] = summarize_process(group)
+    return processes
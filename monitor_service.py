@@ -0,0 +1,255 @@
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import cv2
+from face_gallery import load_known_faces
+from face_matcher import FaceMatcher
+from orchestrator import MODES, make_processor, parse_source
+from pipeline import open_source
+from face_detector import load_detector
+from metrics import METRICS, start_exporter
+
+# Resident monitoring service.
+# Loads the face gallery, the FER model and MediaPipe once, owns the
+# camera, and runs any of the live modes on demand, all fed from the same
+# capture (each mode has its own face detector, as detectors are not
+# thread-safe). streamlit_app.py drives it through a small local
+# HTTP API instead of spawning one cold-starting script per button:
+#
+#   GET  /status               running modes, per-mode stats, camera state
+#   POST /start/<mode>         attendance | session | hand_raise | preview
+#   POST /stop/<mode>          stop one mode
+#   POST /stop                 stop every mode
+#   GET  /frame/<mode>         latest annotated frame of a mode (JPEG)
+#
+#   python monitor_service.py [camera source]
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+FRAME_WAIT = 0.5          # seconds a mode waits for a new frame before re-checking stop
+JPEG_QUALITY = 80
+STOP_TIMEOUT = 5.0        # seconds stop() waits for a mode's current frame
+
+
+class ModeRunner:
+    # One mode on its own thread; it always takes the newest frame and skips the rest
+    def __init__(self, name, processor):
+        self.name = name
+        self.processor = processor
+        self.condition = threading.Condition()
+        self.frame = None
+        self.output = None
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+        self.stats = {"processed": 0, "skipped": 0, "errors": 0}
+        self.thread = threading.Thread(target=self._run, name=f"mode-{name}", daemon=True)
+        self.thread.start()
+
+    def offer(self, frame):
+        with self.condition:
+            if self.frame is not None:
+                self.stats["skipped"] += 1
+                METRICS.count("frames", kind="skipped", mode=self.name)
+            self.frame = frame
+            self.condition.notify()
+
+    def _run(self):
+        # Everything this thread records (detect, encode, fer, pose, ...) is labelled with the mode
+        METRICS.bind(mode=self.name)
+        try:
+            self._loop()
+        finally:
+            # Closed here, never while a frame is still in process()
+            self.processor.close()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                if self.frame is None:
+                    self.condition.wait(FRAME_WAIT)
+                frame, self.frame = self.frame, None
+            if frame is None:
+                continue
+            try:
+                # Processors draw on the frame, so every mode gets its own copy
+                with METRICS.timed("process"):
+                    self.output = self.processor.process(frame.copy())
+                self.stats["processed"] += 1
+                METRICS.count("frames", kind="processed")
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ERROR] [{self.name}] Frame processing failed: {e}")
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        self.stop_event.set()
+        self.thread.join(timeout=timeout)
+        if self.thread.is_alive():
+            print(f"[!] [{self.name}] Still processing a frame; it closes once that frame is done")
+
+    def status(self):
+        status = {"running": True, "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                  **self.stats}
+        gate = getattr(self.processor, "motion_gate", None)
+        if gate is not None:
+            status["analysis_fps"] = round(gate.rate(), 1)
+        return status
+
+
+class MonitorService:
+    def __init__(self, source=0):
+        self.source = source
+        print("[INFO] Loading known faces...")
+        self.matcher = FaceMatcher(*load_known_faces())
+        # Warm every model once; modes started later reuse them
+        from emotion_classifier import load_emotion_model
+        from hand_raise import HandRaiseDetector
+        from event_store import EventStore
+        # One event store for every mode; the modes only hold views on it
+        self.store = EventStore()
+        self.emotion_model = load_emotion_model()
+        self.hand_raise = HandRaiseDetector()
+        self.hand_raise.warm()
+        self.runners = {}
+        self.lock = threading.Lock()
+        self.capture_thread = None
+        self.camera_open = False
+        self.frames_captured = 0
+
+    # --- Modes ---
+    def start(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+        with self.lock:
+            if mode in self.runners:
+                return False
+            # Detector objects are not thread-safe, so every mode gets its own
+            processor = make_processor(mode, self.matcher, self.store, None, load_detector(),
+                                       emotion_model=self.emotion_model, hand_raise=self.hand_raise)
+            self.runners[mode] = ModeRunner(mode, processor)
+            if self.capture_thread is None or not self.capture_thread.is_alive():
+                self.capture_thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+                self.capture_thread.start()
+        print(f"[✓] Started {mode}")
+        return True
+
+    def stop(self, mode=None, timeout=STOP_TIMEOUT):
+        with self.lock:
+            names = [mode] if mode else list(self.runners)
+            runners = [self.runners.pop(name) for name in names if name in self.runners]
+        for runner in runners:
+            runner.stop(timeout)
+            print(f"[✓] Stopped {runner.name}")
+        return [runner.name for runner in runners]
+
+    def status(self):
+        with self.lock:
+            runners = dict(self.runners)
+        return {
+            "camera": {"source": self.source, "open": self.camera_open, "frames": self.frames_captured},
+            "modes": {mode: runners[mode].status() if mode in runners else {"running": False} for mode in MODES},
+        }
+
+    def latest_jpeg(self, mode):
+        runner = self.runners.get(mode)
+        if runner is None or runner.output is None:
+            return None
+        ok, buffer = cv2.imencode(".jpg", runner.output, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        return buffer.tobytes() if ok else None
+
+    # --- Camera: open while at least one mode runs ---
+    def _capture_loop(self):
+        cap = open_source(self.source)
+        if not cap.isOpened():
+            print(f"[ERROR] Could not open video source {self.source}")
+            self.stop()
+            return
+        self.camera_open = True
+        try:
+            while True:
+                with self.lock:
+                    runners = list(self.runners.values())
+                    if not runners:
+                        # Cleared under the lock, so a start() from now on spawns a new capture thread
+                        self.capture_thread = None
+                        break
+                with METRICS.timed("capture"):
+                    ret, frame = cap.read()
+                if not ret:
+                    print("[INFO] Capture ended")
+                    break
+                self.frames_captured += 1
+                METRICS.count("frames", kind="captured")
+                for runner in runners:
+                    runner.offer(frame)
+        finally:
+            cap.release()
+            with self.lock:
+                if self.capture_thread is threading.current_thread():
+                    self.capture_thread = None
+                # A replacement thread may already own the camera
+                if self.capture_thread is None:
+                    self.camera_open = False
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body, content_type="application/json"):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if parts == ["status"]:
+                self._send(200, service.status())
+            elif len(parts) == 2 and parts[0] == "frame":
+                jpeg = service.latest_jpeg(parts[1])
+                if jpeg is None:
+                    self._send(404, {"error": f"no frame for {parts[1]}"})
+                else:
+                    self._send(200, jpeg, "image/jpeg")
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            parts = self.path.strip("/").split("/")
+            try:
+                if len(parts) == 2 and parts[0] == "start":
+                    self._send(200, {"started": service.start(parts[1])})
+                elif parts[0] == "stop" and len(parts) <= 2:
+                    self._send(200, {"stopped": service.stop(parts[1] if len(parts) == 2 else None)})
+                else:
+                    self._send(404, {"error": "not found"})
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass    # Streamlit polls /status; keep the console for events
+
+    return Handler
+
+
+def main(source=0, host=SERVICE_HOST, port=SERVICE_PORT):
+    service = MonitorService(source)
+    start_exporter("monitor_service")
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"[INFO] Monitor service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down...")
+    finally:
+        # Wait for every mode to finish its frame so its logs are flushed
+        service.stop(timeout=None)
+        service.hand_raise.close()
+        service.store.close()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main(parse_source(sys.argv[1]) if len(sys.argv) > 1 else 0)
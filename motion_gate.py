@@ -0,0 +1,88 @@
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+# Motion-gated scheduling for the heavy stages (face detection, FER, pose).
+# Every frame is reduced to a small blurred grayscale thumbnail and compared
+# with the thumbnail of the last analysed frame. Any real change runs the
+# heavy stages at full rate. While the room stays static the analysis
+# interval doubles every STATIC_FRAMES frames up to MAX_INTERVAL, so a
+# still lecture is only re-checked about once a second and activity brings
+# it straight back to full rate.
+
+MOTION_SIZE = (64, 48)
+PIXEL_DELTA = 20          # grey levels a thumbnail pixel must change by
+CHANGED_FRACTION = 0.005  # share of changed pixels that counts as motion
+STATIC_FRAMES = 15        # static frames before the interval doubles
+MAX_INTERVAL = 30         # frames
+RATE_WINDOW = 10.0        # seconds
+
+
+def thumbnail(frame):
+    small = cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    return cv2.GaussianBlur(gray, (3, 3), 0)
+
+
+class MotionGate:
+    def __init__(self, pixel_delta=PIXEL_DELTA, changed_fraction=CHANGED_FRACTION,
+                 static_frames=STATIC_FRAMES, max_interval=MAX_INTERVAL):
+        self.pixel_delta = pixel_delta
+        self.changed_fraction = changed_fraction
+        self.static_frames = static_frames
+        self.max_interval = max_interval
+        self.reference = None
+        self.interval = 1
+        self.static = 0
+        self.since_run = 0
+        self.history = deque()   # (time, ran) for the rate window
+
+    def moved(self, thumb):
+        if self.reference is None:
+            return True
+        changed = np.count_nonzero(cv2.absdiff(thumb, self.reference) > self.pixel_delta)
+        return changed > self.changed_fraction * thumb.size
+
+    def check(self, frame):
+        # True when the heavy stages should run on this frame
+        thumb = thumbnail(frame)
+        if self.moved(thumb):
+            self.interval = 1
+            self.static = 0
+        else:
+            self.static += 1
+            if self.static >= self.static_frames:
+                self.interval = min(self.interval * 2, self.max_interval)
+                self.static = 0
+
+        self.since_run += 1
+        run = self.interval == 1 or self.since_run >= self.interval
+        if run:
+            self.since_run = 0
+            self.reference = thumb
+
+        now = time.monotonic()
+        self.history.append((now, run))
+        while self.history[0][0] < now - RATE_WINDOW:
+            self.history.popleft()
+        return run
+
+    def rate(self):
+        # Analysed frames per second over the last RATE_WINDOW seconds
+        if len(self.history) < 2:
+            return 0.0
+        span = max(self.history[-1][0] - self.history[0][0], 1e-6)
+        return sum(ran for _, ran in self.history) / span
+
+    def duty(self):
+        # Share of incoming frames that were analysed
+        if not self.history:
+            return 1.0
+        return sum(ran for _, ran in self.history) / len(self.history)
+
+
+def draw_rate(frame, gate):
+    h = frame.shape[0]
+    cv2.putText(frame, f"analysis {gate.rate():.1f} fps ({gate.duty():.0%})", (10, h - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import multiprocessing as mp
+from face_gallery import load_known_faces, share_gallery, attach_gallery
+
+# Multi-classroom orchestrator.
+# Runs one headless pipeline per camera source, each in its own process,
+# pinned to its own CPU cores. The known faces gallery is loaded once here
+# and shared read-only with every worker. Attendance rows and emotion /
+# engagement events go to the shared event store, tagged with the room id.
+#
+# cameras.json (see cameras.example.json):
+#   {"rooms": [{"room": "room-101", "source": 0, "mode": "session", "cores": [0, 1]},
+#              {"room": "lab", "source": "rtsp://10.0.0.5/stream", "mode": "attendance"}]}
+#
+# mode: attendance | session | hand_raise | preview
+# source: device index, RTSP/HTTP URL or video file path
+# optional per room: cores, workers, queue_size,
+#   detector (hog | haar | yunet) and tiles ("2x2") for far-away faces
+
+CONFIG_FILE = "cameras.json"
+MODES = ("attendance", "session", "hand_raise", "preview")
+
+
+def load_config(path=CONFIG_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    rooms = config["rooms"]
+    seen = set()
+    for room in rooms:
+        if room.get("mode", "session") not in MODES:
+            raise ValueError(f"Room {room['room']}: unknown mode {room['mode']!r}, expected one of {MODES}")
+        if room["room"] in seen:
+            raise ValueError(f"Duplicate room id {room['room']!r}")
+        seen.add(room["room"])
+    return rooms
+
+
+def parse_source(source):
+    # "0" from the command line / JSON strings still means a device index
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+def pin_to_cores(cores):
+    if not cores:
+        return
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        else:
+            import psutil
+            psutil.Process().cpu_affinity(list(cores))
+    except Exception as e:
+        print(f"[!] Could not pin to cores {cores}: {e}")
+
+
+def make_processor(mode, matcher, store, room, detector=None, emotion_model=None, hand_raise=None):
+    # Imported here so each worker only loads the models its mode needs;
+    # the monitor service passes its already loaded FER model and pose detector.
+    # The caller owns store and closes it after the processor.
+    from event_store import EMOTION, HAND_RAISE
+    if mode == "attendance":
+        from mark_attendance import AttendanceProcessor
+        return AttendanceProcessor(matcher, store.attendance(room=room), detector=detector)
+    if mode == "session":
+        from emotion_hand_combined import SessionProcessor
+        return SessionProcessor(matcher, emotion_logs=store.log(EMOTION, room=room),
+                                engagement_logs=store.log(HAND_RAISE, room=room), detector=detector,
+                                emotion_model=emotion_model, hand_raise=hand_raise)
+    if mode == "hand_raise":
+        from hand_raise_detect import HandRaiseProcessor
+        return HandRaiseProcessor(matcher, store.log(HAND_RAISE, room=room), detector=detector,
+                                  hand_raise=hand_raise)
+    from face_detect_test import PreviewProcessor
+    return PreviewProcessor(matcher, detector=detector)
+
+
+def run_room(room_config, gallery_spec):
+    from face_matcher import FaceMatcher
+    from pipeline import FramePipeline, QUEUE_SIZE
+    from face_detector import load_detector, parse_tiles
+    from event_store import EventStore
+
+    room = room_config["room"]
+    pin_to_cores(room_config.get("cores"))
+    store = EventStore()
+    shm, encodings, names = attach_gallery(gallery_spec)
+    try:
+        detector = load_detector(room_config.get("detector"), tiles=parse_tiles(room_config.get("tiles")))
+        processor = make_processor(room_config.get("mode", "session"), FaceMatcher(encodings, names), store, room,
+                                   detector)
+        print(f"[INFO] [{room}] Starting {room_config.get('mode', 'session')} on {room_config['source']}")
+        stats = FramePipeline(
+            processor.process,
+            source=parse_source(room_config["source"]),
+            workers=room_config.get("workers", 1),
+            queue_size=room_config.get("queue_size", QUEUE_SIZE),
+            name=room,
+        ).run()
+        stats["analysis_fps"] = round(processor.motion_gate.rate(), 1)
+        processor.close()
+        print(f"[INFO] [{room}] Stopped: {stats}")
+    finally:
+        store.close()
+        try:
+            shm.close()
+        except BufferError:
+            pass    # The matcher still maps the segment; it goes away with the process
+
+
+def main(config_path=CONFIG_FILE):
+    rooms = load_config(config_path)
+    print("[INFO] Loading known faces...")
+    encodings, names = load_known_faces()
+    shm, gallery_spec = share_gallery(encodings, names)
+
+    processes = [mp.Process(target=run_room, args=(room, gallery_spec), name=room["room"]) for room in rooms]
+    try:
+        for p in processes:
+            p.start()
+        print(f"[INFO] Monitoring {len(processes)} room(s): {[r['room'] for r in rooms]}")
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        # Workers get the same Ctrl+C and flush their logs; terminate stragglers
+        print("[INFO] Stopping rooms...")
+        for p in processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else CONFIG_FILE)
@@ -0,0 +1,191 @@
+import os
+import time
+import queue
+import threading
+import cv2
+from metrics import METRICS, start_exporter
+
+# Threaded capture -> inference -> render pipeline.
+# A capture thread keeps reading the camera so its buffer never builds up,
+# a pool of inference workers runs the heavy per-frame work, and the render
+# stage (cv2.imshow must stay on the main thread) shows the newest result.
+# Stages are joined by bounded queues; when a queue is full the policy
+# decides which frame is dropped so the display never waits on a backlog.
+
+QUEUE_SIZE = 2
+WORKERS = 1              # Raise only for processors whose state is thread-safe
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+POLL_TIMEOUT = 0.1
+BUS_PREFIX = "bus:"
+
+
+def put_with_policy(q, item, policy):
+    # Returns the number of items dropped to make room (or the item itself)
+    if policy == BLOCK:
+        q.put(item)
+        return 0
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            if policy == DROP_NEWEST:
+                return 1
+        try:
+            q.get_nowait()
+            dropped += 1
+        except queue.Empty:
+            pass
+
+
+def default_source():
+    # CAMERA_SOURCE selects the live scripts' input: device index, URL, file or bus:<name>
+    source = os.environ.get("CAMERA_SOURCE", "0")
+    return int(source) if source.isdigit() else source
+
+
+def open_source(source):
+    # "bus:<name>" reads from a frame_bus.py producer instead of opening the device
+    if isinstance(source, str) and source.startswith(BUS_PREFIX):
+        from frame_bus import BusCapture
+        return BusCapture(source[len(BUS_PREFIX):])
+    return cv2.VideoCapture(source)
+
+
+def is_video_file(source):
+    return isinstance(source, str) and "://" not in source and os.path.isfile(source)
+
+
+def show_window(title):
+    # Render stage for the live scripts; returns False once 'q' is pressed
+    def render(frame):
+        cv2.imshow(title, frame)
+        return not (cv2.waitKey(1) & 0xFF == ord("q"))
+    return render
+
+
+class FramePipeline:
+    def __init__(self, process, render=None, source=0, workers=WORKERS,
+                 queue_size=QUEUE_SIZE, policy=DROP_OLDEST, pace=None, name=None):
+        self.process = process
+        self.name = name
+        self.render = render
+        self.source = source
+        # Video files are read at their own frame rate unless told otherwise,
+        # so they behave like a live camera instead of being drained at once
+        self.pace = is_video_file(source) if pace is None else pace
+        self.workers = workers
+        self.policy = policy
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.capture_done = threading.Event()
+        self.lock = threading.Lock()
+        self.active_workers = 0
+        self.stats = {"captured": 0, "processed": 0, "rendered": 0,
+                      "dropped_capture": 0, "dropped_output": 0, "stale": 0}
+
+    def _count(self, key, n=1):
+        if n:
+            with self.lock:
+                self.stats[key] += n
+            METRICS.count("frames", n, kind=key)
+
+    # --- Stage 1: capture ---
+    def _capture_loop(self, cap):
+        seq = 0
+        interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if self.pace else 0.0
+        next_time = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                with METRICS.timed("capture"):
+                    ret, frame = cap.read()
+                if not ret:
+                    print("[INFO] Capture ended")
+                    break
+                if interval:
+                    next_time += interval
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                seq += 1
+                self._count("captured")
+                self._count("dropped_capture", put_with_policy(self.frames, (seq, frame), self.policy))
+        finally:
+            cap.release()
+            self.capture_done.set()
+
+    # --- Stage 2: inference workers ---
+    def _worker_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    seq, frame = self.frames.get(timeout=POLL_TIMEOUT)
+                except queue.Empty:
+                    if self.capture_done.is_set():
+                        break
+                    continue
+                try:
+                    with METRICS.timed("process"):
+                        output = self.process(frame)
+                except Exception as e:
+                    print(f"[ERROR] Frame processing failed: {e}")
+                    continue
+                self._count("processed")
+                self._count("dropped_output", put_with_policy(self.results, (seq, output), self.policy))
+        finally:
+            with self.lock:
+                self.active_workers -= 1
+
+    def _workers_finished(self):
+        with self.lock:
+            return self.active_workers == 0
+
+    # --- Stage 3: render (caller's thread) ---
+    def run(self):
+        cap = open_source(self.source)
+        if not cap.isOpened():
+            print(f"[ERROR] Could not open video source {self.source}")
+            return self.stats
+        start_exporter(self.name)
+        METRICS.track("queue_depth", self.frames.qsize, queue="frames")
+        METRICS.track("queue_depth", self.results.qsize, queue="results")
+        self.active_workers = self.workers
+        threads = [threading.Thread(target=self._capture_loop, args=(cap,), daemon=True)]
+        threads += [threading.Thread(target=self._worker_loop, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+
+        last_seq = 0
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    seq, output = self.results.get(timeout=POLL_TIMEOUT)
+                except queue.Empty:
+                    if self._workers_finished():
+                        break
+                    continue
+                # Workers can finish out of order; never step back in time
+                if seq < last_seq:
+                    self._count("stale")
+                    continue
+                last_seq = seq
+                self._count("rendered")
+                if self.render is not None:
+                    with METRICS.timed("render"):
+                        keep_going = self.render(output)
+                    if keep_going is False:
+                        break
+        except KeyboardInterrupt:
+            print("[INFO] Interrupted")
+        finally:
+            self.stop()
+            for t in threads:
+                t.join(timeout=2)
+        return self.stats
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,166 @@
+import os
+import sys
+import numpy as np
+from emotion_backends import BACKENDS, QUANTIZED_BACKENDS, KerasBackend, benchmark, load_parity_batch
+from emotion_classifier import EMOTION_LABELS
+
+# Quantized FER models and their accuracy check.
+# Builds statically quantized variants of fer.json + fer.h5, calibrated on
+# face crops from known_faces/ (preprocessed exactly like the live scripts
+# do), then compares each variant with the float32 Keras model on the
+# held-out emotion_images/: top-1 agreement, per-class confusion and speed.
+# The two folders must not overlap, or the agreement check is optimistic.
+#
+#   python quantize_fer.py              build every variant the installed packages allow, then evaluate
+#   python quantize_fer.py --evaluate   evaluate the existing variants only
+#
+#   fer_int8.tflite   TFLite, int8 weights + activations (float32 in/out)
+#   fer_fp16.tflite   TFLite, float16 weights
+#   fer_int8.onnx     ONNX Runtime static int8 (QDQ), needs fer.onnx from convert_to_onnx.py
+#
+# A variant passes when it agrees with fer.h5 on at least 95% of the faces;
+# use it with FER_BACKEND=tflite / tflite_fp16 / onnx_int8.
+
+CALIBRATION_FOLDERS = ("known_faces",)
+EVALUATION_FOLDER = "emotion_images"
+INT8_TFLITE = "fer_int8.tflite"
+FP16_TFLITE = "fer_fp16.tflite"
+SOURCE_ONNX = "fer.onnx"
+INT8_ONNX = "fer_int8.onnx"
+REFERENCE_FILES = ("fer.json", "fer.h5")
+MIN_AGREEMENT = 0.95
+
+
+def calibration_faces(folders=CALIBRATION_FOLDERS, held_out=EVALUATION_FOLDER):
+    batches = []
+    for folder in folders:
+        if os.path.abspath(folder) == os.path.abspath(held_out):
+            raise ValueError(f"{folder} is the evaluation folder; calibrate on other images")
+        if not os.path.isdir(folder):
+            continue
+        try:
+            files, batch = load_parity_batch(folder)
+        except ValueError:
+            print(f"[!] No usable face crops in {folder}")
+            continue
+        print(f"[INFO] Calibration faces from {folder}: {', '.join(files)}")
+        batches.append(batch)
+    if not batches:
+        raise RuntimeError(f"No calibration faces found in {folders}")
+    faces = np.concatenate(batches)
+    # Mirrored crops double the small sample set
+    return np.concatenate([faces, faces[:, :, ::-1]])
+
+
+def save_model(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    print(f"[✓] Saved {path} ({len(data) / 1024:.0f} KB)")
+
+
+def quantize_tflite(faces):
+    import tensorflow as tf
+    model = KerasBackend().model
+
+    def representative_dataset():
+        for face in faces:
+            yield [face[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    save_model(INT8_TFLITE, converter.convert())
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    save_model(FP16_TFLITE, converter.convert())
+
+
+def quantize_onnx(faces, source=SOURCE_ONNX):
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"{source} (run convert_to_onnx.py first)")
+    input_name = ort.InferenceSession(source, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class FaceReader(CalibrationDataReader):
+        def __init__(self):
+            self.feeds = iter({input_name: face[np.newaxis]} for face in faces)
+
+        def get_next(self):
+            return next(self.feeds, None)
+
+    quantize_static(source, INT8_ONNX, FaceReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    print(f"[✓] Saved {INT8_ONNX} ({os.path.getsize(INT8_ONNX) / 1024:.0f} KB)")
+
+
+def build():
+    faces = calibration_faces()
+    print(f"[INFO] Calibrating on {len(faces)} face crops from {', '.join(CALIBRATION_FOLDERS)}")
+    for name, quantize in (("TFLite", quantize_tflite), ("ONNX Runtime", quantize_onnx)):
+        try:
+            quantize(faces)
+        except Exception as e:
+            # Missing package or model, or a converter error; try the next variant
+            print(f"[!] Skipping {name} quantization: {e}")
+
+
+def print_confusion(expected, predicted):
+    # Rows: fer.h5 label, columns: quantized label; only classes that occur
+    classes = sorted(set(expected) | set(predicted))
+    short = [EMOTION_LABELS[c][:4] for c in classes]
+    print("    " + f"{'fer.h5 / quant':<16}" + "".join(f"{s:>6}" for s in short) + f"{'agree':>8}")
+    for c in classes:
+        row = [int(np.sum((expected == c) & (predicted == other))) for other in classes]
+        total = int(np.sum(expected == c))
+        agree = f"{row[classes.index(c)] / total:.0%}" if total else "-"
+        print("    " + f"{EMOTION_LABELS[c]:<16}" + "".join(f"{n:>6}" for n in row) + f"{agree:>8}")
+
+
+def evaluate(reference="keras", folder=EVALUATION_FOLDER):
+    missing = [path for path in REFERENCE_FILES if not os.path.exists(path)]
+    if reference == "keras" and missing:
+        print(f"[ERROR] Reference model missing: {', '.join(missing)}")
+        return False
+    files, batch = load_parity_batch(folder)
+    reference_backend = BACKENDS[reference]()
+    expected_scores = reference_backend.predict(batch)
+    expected = np.argmax(expected_scores, axis=1)
+    reference_ms = benchmark(reference_backend) * 1000
+    print(f"[INFO] Evaluation faces from {folder}: {', '.join(files)}")
+    print(f"[INFO] {len(files)} faces from {folder}; {reference}: {reference_ms:.2f} ms per batch")
+
+    ok, compared = True, 0
+    for name in QUANTIZED_BACKENDS:
+        try:
+            backend = BACKENDS[name]()
+        except Exception as e:
+            print(f"[!] {name} unavailable: {e}")
+            continue
+        compared += 1
+        scores = backend.predict(batch)
+        predicted = np.argmax(scores, axis=1)
+        agreement = float(np.mean(predicted == expected))
+        ms = benchmark(backend) * 1000
+        passed = agreement >= MIN_AGREEMENT
+        print(f"[{'✓' if passed else '✗'}] {name}: top-1 agreement {int(np.sum(predicted == expected))}/{len(files)} "
+              f"({agreement:.0%}), max |diff| {float(np.max(np.abs(scores - expected_scores))):.3f}, "
+              f"{ms:.2f} ms per batch ({reference_ms / ms:.1f}x)")
+        print_confusion(expected, predicted)
+        for filename in np.array(files)[predicted != expected]:
+            print(f"    disagrees on {filename}")
+        ok &= passed
+    if not compared:
+        # Nothing checked is not a pass
+        print("[ERROR] No quantized model could be evaluated; run python quantize_fer.py to build them")
+        return False
+    return ok
+
+
+if __name__ == "__main__":
+    if "--evaluate" not in sys.argv:
+        build()
+    sys.exit(0 if evaluate() else 1)
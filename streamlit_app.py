@@ -1,191 +1,239 @@
-import streamlit as st
-import subprocess
-import os
-import time
-import psutil
-from datetime import datetime
-import sys
-
-
-st.set_page_config(page_title="Smart Class Monitor", layout="centered")
-st.markdown("<h1 style='text-align: center;'>📸 Smart Class Monitor</h1>", unsafe_allow_html=True)
-
-# --- Function to kill a process by PID ---
-def kill_process(pid):
-    try:
-        p = psutil.Process(pid)
-        p.terminate()
-        p.wait(timeout=3)
-        return True
-    except Exception as e:
-        print(f"[ERROR] Could not terminate PID {pid}: {e}")
-        return False
-
-# ---- Section: Attendance Controls ----
-st.markdown("## 📍 Attendance Controls")
-col1, col2 = st.columns(2)
-
-with col1:
-    if st.button("✅ Start Attendance", use_container_width=True):
-        process = subprocess.Popen([sys.executable, "mark_attendance.py"])
-        st.session_state.attendance_pid = process.pid
-        st.success("🟢 Attendance started.")
-
-with col2:
-    if st.button("⛔ Stop Attendance", use_container_width=True):
-        if "attendance_pid" in st.session_state and kill_process(st.session_state.attendance_pid):
-            st.success("✅ Attendance process stopped.")
-        else:
-            st.warning("⚠️ Could not stop attendance process.")
-
-# ---- Section: Session Controls ----
-st.markdown("## 🎯 Engagement Session Controls")
-col3, col4 = st.columns(2)
-
-with col3:
-    if st.button("📡 Start Session (Hand + Emotion)", use_container_width=True):
-        venv_python = os.path.join(".venv", "Scripts", "python.exe")
-        combined_proc = subprocess.Popen([venv_python, "emotion_hand_combined.py"])
-        
-        st.session_state.session_pid = combined_proc.pid
-        st.success("🟢 Session started.")
-
-
-with col4:
-    if st.button("🛑 Stop Session", use_container_width=True):
-        success = False
-        if "hand_pid" in st.session_state:
-            success |= kill_process(st.session_state.hand_pid)
-        if "emotion_pid" in st.session_state:
-            success |= kill_process(st.session_state.emotion_pid)
-        if success:
-            st.success("✅ Session processes stopped.")
-        else:
-            st.warning("⚠️ Could not stop session processes.")
-
-# ---- Section: Live Face Detection ----
-st.markdown("## 🧠 Live Face Detection")
-col_live1, col_live2 = st.columns(2)
-
-if "face_pid" not in st.session_state:
-    st.session_state.face_pid = None
-
-with col_live1:
-    if st.button("🔁 Show Live Face Detection", use_container_width=True):
-        process = subprocess.Popen([sys.executable, "face_detect_test.py"])
-        st.session_state.face_pid = process.pid
-        time.sleep(1)
-        st.rerun()
-
-with col_live2:
-    if st.button("❌ Close Face Recognition", use_container_width=True):
-        if st.session_state.face_pid:
-            try:
-                p = psutil.Process(st.session_state.face_pid)
-                p.terminate()
-                p.wait(timeout=3)
-                st.success("✅ Face recognition stopped.")
-                st.session_state.face_pid = None
-            except Exception as e:
-                st.warning(f"⚠️ Could not stop: {e}")
-        else:
-            st.warning("⚠️ No face recognition process running.")
-
-
-
-# ---- Section: Summary Reports ----
-st.markdown("## 📋 Summary Reports")
-
-if st.button("🛠️ Generate Today's Summary", use_container_width=True):
-    subprocess.run(["python", "generate_summary.py"])
-    st.success("✅ Summary generated successfully.")
-
-# View Today's Summary
-if st.button("📅 View Today’s Summary", use_container_width=True):
-    subprocess.run(["python", "generate_summary.py"])
-    today = datetime.now().strftime("%Y-%m-%d")
-    filepath = os.path.join("Summaries", f"{today}.txt")
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
-        st.text_area("📝 Today's Summary", content, height=300, disabled=True)
-        if st.button("❌ Close Today's Summary", use_container_width=True):
-            st.experimental_rerun()
-    else:
-        st.error("⚠️ Summary file not found for today.")
-
-# ---- View Past Summaries with Toggle Button ----
-if "show_past_summary" not in st.session_state:
-    st.session_state.show_past_summary = False
-if "selected_summary_file" not in st.session_state:
-    st.session_state.selected_summary_file = None
-
-def toggle_summary_visibility():
-    st.session_state.show_past_summary = not st.session_state.show_past_summary
-    st.session_state.selected_summary_file = None
-
-toggle_label = "❌ Close Past Summary" if st.session_state.show_past_summary else "📁 View Past Summaries"
-st.button(toggle_label, on_click=toggle_summary_visibility, use_container_width=True)
-
-if st.session_state.show_past_summary:
-    summaries_dir = "Summaries"
-    if os.path.exists(summaries_dir):
-        summaries = sorted(
-            [f for f in os.listdir(summaries_dir) if f.endswith(".txt")],
-            reverse=True
-        )
-        if summaries:
-            selected = st.selectbox(
-                "🗂️ Select a past summary to view:",
-                ["-- Select a summary --"] + summaries,
-                index=0,
-                key="summary_selector"
-            )
-            if selected != "-- Select a summary --":
-                st.session_state.selected_summary_file = selected
-
-        if st.session_state.selected_summary_file:
-            filepath = os.path.join(summaries_dir, st.session_state.selected_summary_file)
-            with open(filepath, "r", encoding="utf-8") as f:
-                content = f.read()
-            st.text_area("📖 Summary Content", content, height=300, disabled=True)
-    else:
-        st.error("📁 'Summaries' folder does not exist.")
-
-# ---- Isolated Styling for Only the "End Class" Button ----
-
-
-import streamlit as st
-import os
-
-# Add CSS to style the button inside .end-class-btn
-import streamlit as st
-import os
-
-# Inline CSS to target the button inside the wrapper div
-st.markdown("""
-    <style>
-    .end-class-btn button {
-        font-size: 24px !important;
-        padding: 20px !important;
-        height: auto;
-        width: 100%;
-        border-radius: 8px;
-        background-color: #d9534f;
-        color: white;
-        font-weight: bold;
-        border: none;
-    }
-
-    .end-class-btn button:hover {
-        background-color: #c9302c;
-        cursor: pointer;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# Wrap st.button in a div with class
-st.markdown('<div class="end-class-btn">', unsafe_allow_html=True)
-if st.button("🛑 End Class", use_container_width=True):
-    os.system("taskkill /f /im python.exe")
-st.markdown('</div>', unsafe_allow_html=True)
+import streamlit as st
+import subprocess
+import os
+import time
+import json
+import urllib.request
+import urllib.error
+from datetime import datetime
+from event_store import connect, daily_attendance, daily_counts, EMOTION, HAND_RAISE
+from metrics import read_metrics
+
+
+st.set_page_config(page_title="Smart Class Monitor", layout="centered")
+st.markdown("<h1 style='text-align: center;'>📸 Smart Class Monitor</h1>", unsafe_allow_html=True)
+
+# --- Monitor service (python monitor_service.py keeps the models and camera warm) ---
+SERVICE_URL = "http://127.0.0.1:8765"
+PREVIEW_INTERVAL = 0.3   # seconds between preview frame polls
+
+def call_service(path, method="POST"):
+    try:
+        request = urllib.request.Request(SERVICE_URL + path, method=method)
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = response.read()
+            return json.loads(body) if response.headers.get_content_type() == "application/json" else body
+    except urllib.error.HTTPError as e:
+        print(f"[ERROR] {method} {path}: {e}")
+        return None
+    except OSError as e:
+        st.warning("⚠️ Monitor service is not running. Start it with: python monitor_service.py")
+        print(f"[ERROR] Could not reach monitor service: {e}")
+        return None
+
+def start_mode(mode, message):
+    result = call_service(f"/start/{mode}")
+    if result is not None:
+        st.success(message if result["started"] else "ℹ️ Already running.")
+
+def stop_mode(mode, message, warning):
+    result = call_service(f"/stop/{mode}")
+    if result is not None:
+        if result["stopped"]:
+            st.success(message)
+        else:
+            st.warning(warning)
+
+# ---- Section: Attendance Controls ----
+st.markdown("## 📍 Attendance Controls")
+col1, col2 = st.columns(2)
+
+with col1:
+    if st.button("✅ Start Attendance", use_container_width=True):
+        start_mode("attendance", "🟢 Attendance started.")
+
+with col2:
+    if st.button("⛔ Stop Attendance", use_container_width=True):
+        stop_mode("attendance", "✅ Attendance stopped.", "⚠️ Attendance is not running.")
+
+# ---- Section: Session Controls ----
+st.markdown("## 🎯 Engagement Session Controls")
+col3, col4 = st.columns(2)
+
+with col3:
+    if st.button("📡 Start Session (Hand + Emotion)", use_container_width=True):
+        start_mode("session", "🟢 Session started.")
+
+with col4:
+    if st.button("🛑 Stop Session", use_container_width=True):
+        stop_mode("session", "✅ Session stopped.", "⚠️ No session running.")
+
+# ---- Section: Live Face Detection ----
+st.markdown("## 🧠 Live Face Detection")
+col_live1, col_live2 = st.columns(2)
+
+with col_live1:
+    if st.button("🔁 Show Live Face Detection", use_container_width=True):
+        start_mode("preview", "🟢 Face recognition started.")
+        time.sleep(1)
+
+with col_live2:
+    if st.button("❌ Close Face Recognition", use_container_width=True):
+        stop_mode("preview", "✅ Face recognition stopped.", "⚠️ No face recognition process running.")
+
+status = call_service("/status", method="GET")
+if status is not None:
+    running = [mode for mode, info in status["modes"].items() if info["running"]]
+    st.caption("Running: " + (", ".join(running) if running else "nothing"))
+    if status["modes"]["preview"]["running"]:
+        def show_preview():
+            preview = call_service("/frame/preview", method="GET")
+            if preview:
+                st.image(preview, caption="Live preview")
+
+        if hasattr(st, "fragment"):
+            # Only the preview reruns on the timer, not the whole page
+            st.fragment(run_every=PREVIEW_INTERVAL)(show_preview)()
+        else:
+            show_preview()
+
+
+
+# ---- Section: Today's Activity (live from the event store) ----
+st.markdown("## 📊 Today's Activity")
+today_str = datetime.now().strftime("%Y-%m-%d")
+conn = connect()
+present = daily_attendance(conn, today_str)
+emotion_counts = daily_counts(conn, today_str, EMOTION)
+hand_counts = daily_counts(conn, today_str, HAND_RAISE)
+conn.close()
+
+col_a, col_b, col_c = st.columns(3)
+col_a.metric("Present", len(present))
+col_b.metric("Emotion events", sum(sum(c for emo, c in counts.items() if emo != "Neutral") for counts in emotion_counts.values()))
+col_c.metric("Hand raises", sum(hand_counts.values()))
+if present:
+    st.caption("Present: " + ", ".join(present))
+
+# ---- Section: Live Performance (metrics/*.prom, written by the running scripts) ----
+st.markdown("## ⏱️ Live Performance")
+processes = read_metrics()
+if not processes:
+    st.info("No live metrics. Start attendance, a session or the monitor service to see per-stage timings.")
+for process_name, perf in processes.items():
+    st.markdown(f"**{process_name}**")
+    col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+    col_p1.metric("FPS", perf["fps"].get("processed", 0))
+    col_p2.metric("Dropped", sum(n for kind, n in perf["frames"].items() if kind.startswith("dropped") or kind == "skipped"))
+    col_p3.metric("Queue depth", sum(perf["queues"].values()))
+    col_p4.metric("Faces / frame", perf["faces_mean"] if perf["faces_mean"] is not None else "-")
+    # Slowest stage first: that is where the lag comes from
+    rows = [{"stage": stage, **stats} for stage, stats in perf["stages"].items()]
+    rows.sort(key=lambda row: row["total_s"], reverse=True)
+    if rows:
+        st.table(rows)
+if st.button("🔄 Refresh Metrics", use_container_width=True):
+    st.rerun()
+
+# ---- Section: Summary Reports ----
+st.markdown("## 📋 Summary Reports")
+
+if st.button("🛠️ Generate Today's Summary", use_container_width=True):
+    subprocess.run(["python", "generate_summary.py"])
+    st.success("✅ Summary generated successfully.")
+
+# View Today's Summary
+if st.button("📅 View Today’s Summary", use_container_width=True):
+    subprocess.run(["python", "generate_summary.py"])
+    today = datetime.now().strftime("%Y-%m-%d")
+    filepath = os.path.join("Summaries", f"{today}.txt")
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            content = f.read()
+        st.text_area("📝 Today's Summary", content, height=300, disabled=True)
+        if st.button("❌ Close Today's Summary", use_container_width=True):
+            st.experimental_rerun()
+    else:
+        st.error("⚠️ Summary file not found for today.")
+
+# ---- View Past Summaries with Toggle Button ----
+if "show_past_summary" not in st.session_state:
+    st.session_state.show_past_summary = False
+if "selected_summary_file" not in st.session_state:
+    st.session_state.selected_summary_file = None
+
+def toggle_summary_visibility():
+    st.session_state.show_past_summary = not st.session_state.show_past_summary
+    st.session_state.selected_summary_file = None
+
+toggle_label = "❌ Close Past Summary" if st.session_state.show_past_summary else "📁 View Past Summaries"
+st.button(toggle_label, on_click=toggle_summary_visibility, use_container_width=True)
+
+if st.session_state.show_past_summary:
+    summaries_dir = "Summaries"
+    if os.path.exists(summaries_dir):
+        summaries = sorted(
+            [f for f in os.listdir(summaries_dir) if f.endswith(".txt")],
+            reverse=True
+        )
+        if summaries:
+            selected = st.selectbox(
+                "🗂️ Select a past summary to view:",
+                ["-- Select a summary --"] + summaries,
+                index=0,
+                key="summary_selector"
+            )
+            if selected != "-- Select a summary --":
+                st.session_state.selected_summary_file = selected
+
+        if st.session_state.selected_summary_file:
+            filepath = os.path.join(summaries_dir, st.session_state.selected_summary_file)
+            with open(filepath, "r", encoding="utf-8") as f:
+                content = f.read()
+            st.text_area("📖 Summary Content", content, height=300, disabled=True)
+    else:
+        st.error("📁 'Summaries' folder does not exist.")
+
+# ---- Isolated Styling for Only the "End Class" Button ----
+
+
+import streamlit as st
+import os
+
+# Add CSS to style the button inside .end-class-btn
+import streamlit as st
+import os
+
+# Inline CSS to target the button inside the wrapper div
+st.markdown("""
+    <style>
+    .end-class-btn button {
+        font-size: 24px !important;
+        padding: 20px !important;
+        height: auto;
+        width: 100%;
+        border-radius: 8px;
+        background-color: #d9534f;
+        color: white;
+        font-weight: bold;
+        border: none;
+    }
+
+    .end-class-btn button:hover {
+        background-color: #c9302c;
+        cursor: pointer;
+    }
+    </style>
+""", unsafe_allow_html=True)
+
+# Wrap st.button in a div with class
+st.markdown('<div class="end-class-btn">', unsafe_allow_html=True)
+if st.button("🛑 End Class", use_container_width=True):
+    if call_service("/stop") is not None:
+        st.success("✅ All monitoring stopped.")
+st.markdown('</div>', unsafe_allow_html=True)
+
+# ---- Live preview on older Streamlit (no st.fragment): rerun the page on a timer ----
+if status is not None and status["modes"]["preview"]["running"] and not hasattr(st, "fragment"):
+    time.sleep(PREVIEW_INTERVAL)
+    st.rerun()
@@ -0,0 +1,232 @@
+import os
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from face_gallery import load_known_faces, share_gallery, attach_gallery
+from attendance_store import AttendanceStore
+from event_log import EventLog
+from event_store import connect, import_paths
+
+# Offline analysis of recorded lecture video.
+# The file is split into time segments that run in parallel worker
+# processes. Each worker samples every FRAME_STRIDE-th frame, runs the same
+# attendance and session (emotion + hand raise) processors as the live
+# scripts on a clock driven by the video position, and returns its events.
+# The events are merged in video-time order, the live cooldowns are applied
+# across segment boundaries, and the results are written to
+# Video/results/<video name>/ (attendance.csv, emotion_log.jsonl,
+# engagement_log.jsonl), replacing any previous run for that video, and
+# imported into the event store (again replacing that video's earlier rows).
+#
+#   python video_batch.py Video/lecture.mp4 --start "2025-07-12 09:00:00"
+
+FRAME_STRIDE = 5
+ATTENDANCE_EVERY = 10        # sampled frames between attendance passes
+MIN_SEGMENT_SECONDS = 60
+EMOTION_COOLDOWN = timedelta(minutes=10)
+RESULTS_DIR = os.path.join("Video", "results")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class VideoClock:
+    def __init__(self, start_time, fps):
+        self.start_time = start_time
+        self.fps = fps
+        self.frame = 0
+
+    def __call__(self):
+        return self.start_time + timedelta(seconds=self.frame / self.fps)
+
+
+class MemoryLog:
+    # Same interface as EventLog, keeps records for the merge step
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class MemoryAttendance:
+    # Same interface as AttendanceStore
+    def __init__(self):
+        self.rows = []
+        self.marked = set()
+
+    def mark(self, name, now=None):
+        key = (name, now.date())
+        if key in self.marked:
+            return False
+        self.marked.add(key)
+        self.rows.append({"name": name, "timestamp": now.strftime(TIME_FORMAT)})
+        return True
+
+    def maybe_flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def probe(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"Could not open video {path}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    if frames <= 0:
+        raise OSError(f"Could not read the frame count of {path}")
+    return frames, fps
+
+
+def plan_segments(frames, fps, count):
+    min_frames = int(MIN_SEGMENT_SECONDS * fps)
+    count = max(1, min(count, frames // max(min_frames, 1) or 1))
+    size = -(-frames // count)
+    return [(start, min(start + size, frames)) for start in range(0, frames, size)]
+
+
+# --- Worker process ---
+_worker = {}
+
+
+def init_worker(gallery_spec):
+    from face_matcher import FaceMatcher
+    from emotion_classifier import load_emotion_model
+    shm, encodings, names = attach_gallery(gallery_spec)
+    _worker["shm"] = shm
+    _worker["matcher"] = FaceMatcher(encodings, names)
+    _worker["emotion_model"] = load_emotion_model()
+
+
+def process_segment(path, start_frame, end_frame, stride, fps, start_time):
+    from mark_attendance import AttendanceProcessor
+    from emotion_hand_combined import SessionProcessor
+
+    clock = VideoClock(start_time, fps)
+    attendance = MemoryAttendance()
+    emotions, engagement = MemoryLog(), MemoryLog()
+    attendance_processor = AttendanceProcessor(_worker["matcher"], attendance, clock=clock, current_person_path=None)
+    session_processor = SessionProcessor(_worker["matcher"], _worker["emotion_model"], emotions, engagement, clock=clock)
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    sampled = 0
+    try:
+        for index in range(start_frame, end_frame):
+            # grab() skips decoding the frames in between samples
+            if (index - start_frame) % stride:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            clock.frame = index
+            session_processor.process(frame)
+            if sampled % ATTENDANCE_EVERY == 0:
+                attendance_processor.process(frame)
+            sampled += 1
+    finally:
+        cap.release()
+        # Workers are reused across segments; free the hand-raise pool and its Pose graphs
+        session_processor.close()
+    print(f"[✓] Segment {start_frame}-{end_frame}: {sampled} frames analysed")
+    return {"attendance": attendance.rows, "emotion": emotions.records, "engagement": engagement.records}
+
+
+# --- Merge ---
+def merge(results):
+    # Segments restart their cooldowns, so apply the live gates again here
+    attendance, emotion, engagement = [], [], []
+    seen_attendance, last_emotion, seen_hand = set(), {}, set()
+
+    for row in sorted((r for res in results for r in res["attendance"]), key=lambda r: r["timestamp"]):
+        key = (row["name"], row["timestamp"][:10])
+        if key not in seen_attendance:
+            seen_attendance.add(key)
+            attendance.append(row)
+
+    for record in sorted((r for res in results for r in res["emotion"]), key=lambda r: r["timestamp"]):
+        now = datetime.strptime(record["timestamp"], TIME_FORMAT)
+        last = last_emotion.get(record["name"])
+        if last is None or now - last >= EMOTION_COOLDOWN:
+            last_emotion[record["name"]] = now
+            emotion.append(record)
+
+    for record in sorted((r for res in results for r in res["engagement"]), key=lambda r: r["timestamp"]):
+        key = (record["student"], record["timestamp"][:16])
+        if key not in seen_hand:
+            seen_hand.add(key)
+            engagement.append(record)
+
+    return attendance, emotion, engagement
+
+
+def write_results(out_dir, attendance, emotion, engagement, room):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, name) for name in ("attendance.csv", "emotion_log.jsonl", "engagement_log.jsonl")]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+    store = AttendanceStore(paths[0], room=room)
+    for row in attendance:
+        store.mark(row["name"], datetime.strptime(row["timestamp"], TIME_FORMAT))
+    store.close()
+    for path, records in ((paths[1], emotion), (paths[2], engagement)):
+        log = EventLog(path, room=room)
+        for record in records:
+            log.append(record)
+        log.close()
+    print(f"[✓] {len(attendance)} attendance, {len(emotion)} emotion, {len(engagement)} hand raise events → {out_dir}")
+
+
+def run(path, start_time=None, stride=FRAME_STRIDE, workers=None, room=None, out_dir=None):
+    frames, fps = probe(path)
+    if start_time is None:
+        # Recordings are usually closed when the lecture ends
+        start_time = datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=frames / fps)
+    workers = workers or os.cpu_count() or 1
+    segments = plan_segments(frames, fps, workers)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    room = room or stem
+    out_dir = out_dir or os.path.join(RESULTS_DIR, stem)
+    print(f"[INFO] {path}: {frames} frames @ {fps:.1f} fps from {start_time:%Y-%m-%d %H:%M:%S}, "
+          f"{len(segments)} segment(s), stride {stride}")
+
+    print("[INFO] Loading known faces...")
+    shm, gallery_spec = share_gallery(*load_known_faces())
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(segments)), initializer=init_worker,
+                                 initargs=(gallery_spec,)) as pool:
+            futures = [pool.submit(process_segment, path, start, end, stride, fps, start_time)
+                       for start, end in segments]
+            results = [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    write_results(out_dir, *merge(results), room=room)
+    conn = connect()
+    import_paths(conn, [out_dir])
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse a recorded lecture video offline")
+    parser.add_argument("video")
+    parser.add_argument("--start", help='video start time, "YYYY-MM-DD HH:MM:SS" (default: file mtime minus duration)')
+    parser.add_argument("--stride", type=int, default=FRAME_STRIDE, help="analyse every Nth frame")
+    parser.add_argument("--workers", type=int, help="parallel segments (default: CPU count)")
+    parser.add_argument("--room", help="room id for the results (default: video file name)")
+    parser.add_argument("--out", help="output directory (default: Video/results/<video name>)")
+    args = parser.parse_args()
+    run(args.video,
+        start_time=datetime.strptime(args.start, TIME_FORMAT) if args.start else None,
+        stride=args.stride, workers=args.workers, room=args.room, out_dir=args.out)